@@ -1,188 +1,390 @@
+import time
+# Startup timing starts here, before pygame itself is imported
+LAUNCH_TIME = time.perf_counter()
+
 import pygame
 import random
-import json
-import time
+import os
+import sys
 from pygame.locals import *
-
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+from colors import *
+from text_cache import TextCache
+from layers import Layer, HudWidget
+from dirty_rects import DirtyRectRenderer
+from pacing import FixedTimestep, FramePacer
+from profiler import FrameProfiler, open_trace
+from analytics import TypingAnalytics, append_jsonl
+from history import SessionTracker, SESSIONS_DB
+from replay import SessionRecorder, RecordedWords, new_recording_path
+from dictionary import load_dictionary
+from capture import FrameCapture
+from pipeline import SimulationThread, LatencyMeter
+from audio import NullAudio, open_audio
+from startup import StartupTimer, BackgroundLoader
+from game_state import GameState, BACKSPACE, SUBMIT, HIT, MISS, GAME_OVER
 
 # Game window setup
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Word Shutter Typing Game")
-clock = pygame.time.Clock()
-
-# New Color Palette
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-DARK_BLUE = (13, 19, 33)
-LIGHT_BLUE = (100, 149, 237)
-TEAL = (0, 128, 128)
-GOLD = (255, 215, 0)
-CORAL = (255, 127, 80)
-LAVENDER = (230, 230, 250)
-MINT = (189, 252, 201)
-SALMON = (250, 128, 114)
-PURPLE = (147, 112, 219)
-LIME = (50, 205, 50)
-SKY_BLUE = (135, 206, 235)
-
-# Fonts - Adjusted sizes to fit better
-try:
-    font_tiny = pygame.font.Font(None, 20)  # Reduced from 24
-    font_small = pygame.font.Font(None, 28) # Reduced from 36
-    font_medium = pygame.font.Font(None, 36) # Reduced from 48
-    font_large = pygame.font.Font(None, 60)  # Reduced from 72
-except:
-    # Fallback if fonts fail to load
-    font_tiny = pygame.font.SysFont('arial', 16)
-    font_small = pygame.font.SysFont('arial', 20)
-    font_medium = pygame.font.SysFont('arial', 28)
-    font_large = pygame.font.SysFont('arial', 40)
-
-# Sound effects (unchanged)
-try:
-    correct_sound = pygame.mixer.Sound("correct.wav")
-    error_sound = pygame.mixer.Sound("error.wav")
-    level_up_sound = pygame.mixer.Sound("level_up.wav")
-    countdown_sound = pygame.mixer.Sound("countdown.wav")
-except:
-    correct_sound = pygame.mixer.Sound(buffer=bytearray(0))
-    error_sound = pygame.mixer.Sound(buffer=bytearray(0))
-    level_up_sound = pygame.mixer.Sound(buffer=bytearray(0))
-    countdown_sound = pygame.mixer.Sound(buffer=bytearray(0))
-
-# Word pool (unchanged)
-word_pool = [
-    "cat", "dog", "run", "sun", "code", "game", "type", "word", "key", "fun",
-    "box", "zoo", "car", "map", "cup", "hat", "pen", "jam", "fox", "log",
-    "python", "typing", "shooter", "keyboard", "display", "program", "develop",
-    "rocket", "basket", "garden", "window", "monitor", "laptop", "digital",
-    "algorithm", "mechanics", "keyboard", "challenge", "adventure", "programming",
-    "beautiful", "dangerous", "happiness", "knowledge", "mountain", "quickly"
-]
-
-# Game variables (unchanged except for font size adjustments above)
-active_words = []
-current_input = ""
-score = 0
-high_score = 0
-words_typed = 0
-highest_words_typed = 0
+
+# Stress mode for soak tests (WORD_SHUTTER_STRESS=<words>): keeps that many
+# words on screen and recycles words that reach the bottom instead of
+# ending the game
+STRESS_WORDS = int(os.environ.get("WORD_SHUTTER_STRESS", "0"))
+
+# Opt-in dirty-rectangle rendering of the gameplay screen
+# (WORD_SHUTTER_DIRTY_RECTS=1); other screens always flip the whole frame
+DIRTY_RECTS = os.environ.get("WORD_SHUTTER_DIRTY_RECTS") == "1"
+
+# Frame pacing (WORD_SHUTTER_PACING=capped|vsync|uncapped, capped frames
+# at WORD_SHUTTER_FPS). The game itself always steps at SIM_RATE per second.
+PACING = os.environ.get("WORD_SHUTTER_PACING", "capped")
+FPS = int(os.environ.get("WORD_SHUTTER_FPS", "60"))
+SIM_RATE = 60
+
+# Every finished game is kept in the session history database
+# (WORD_SHUTTER_DB, default sessions.db) under WORD_SHUTTER_PLAYER, by
+# default the login name
+SESSIONS_PATH = os.environ.get("WORD_SHUTTER_DB", SESSIONS_DB)
+
+# Typing statistics of every game are appended as JSON lines to
+# WORD_SHUTTER_ANALYTICS, if set
+ANALYTICS_PATH = os.environ.get("WORD_SHUTTER_ANALYTICS")
+
+# Every game is recorded to WORD_SHUTTER_REPLAY_DIR for replay.py, unless
+# WORD_SHUTTER_RECORD=0
+RECORD_SESSIONS = os.environ.get("WORD_SHUTTER_RECORD", "1") != "0"
+REPLAY_DIR = os.environ.get("WORD_SHUTTER_REPLAY_DIR", "replays")
+
+# Frame profiler: F3 toggles an overlay with fps, frame time percentiles,
+# entity counts and the slowest phases (WORD_SHUTTER_PROFILE=1 shows it from
+# the start). WORD_SHUTTER_PROFILE_TRACE=<file> streams every frame's phase
+# timings to a .csv file, or a .json Chrome trace for chrome://tracing.
+PROFILE = os.environ.get("WORD_SHUTTER_PROFILE") == "1"
+PROFILE_TRACE = os.environ.get("WORD_SHUTTER_PROFILE_TRACE")
+
+# External word list (WORD_SHUTTER_WORDS=<file>, or WORD_SHUTTER_LOCALE=<code>
+# for words/<code>.txt); the built-in word pool is used when neither is set
+WORD_LIST = os.environ.get("WORD_SHUTTER_WORDS")
+if WORD_LIST is None and os.environ.get("WORD_SHUTTER_LOCALE"):
+    WORD_LIST = os.path.join("words", os.environ["WORD_SHUTTER_LOCALE"] + ".txt")
+
+# Sound effects (WORD_SHUTTER_AUDIO=0 to play without sound)
+AUDIO = os.environ.get("WORD_SHUTTER_AUDIO", "1") != "0"
+SOUNDS = {
+    "correct": ("correct.wav", "hits"),
+    "error": ("error.wav", "errors"),
+    "level_up": ("level_up.wav", "ui"),
+    "countdown": ("countdown.wav", "ui"),
+}
+
+# Capture every frame shown, encoded in the background
+# (WORD_SHUTTER_CAPTURE=frames/frame_%06d.png, session.rgb or session.mp4;
+# see capture.py)
+CAPTURE_PATH = os.environ.get("WORD_SHUTTER_CAPTURE")
+
+# Pipelined mode (WORD_SHUTTER_PIPELINE=1): the game steps on its own
+# thread and the main thread draws its latest snapshot (see pipeline.py).
+# Replays always run sequentially.
+PIPELINE = os.environ.get("WORD_SHUTTER_PIPELINE") == "1"
+
+# Print input-to-screen latency percentiles on exit
+# (WORD_SHUTTER_LATENCY_REPORT=1); they are also in the profiler overlay
+LATENCY_REPORT = os.environ.get("WORD_SHUTTER_LATENCY_REPORT") == "1"
+
+# Print how long startup took, up to the first frame and until the
+# background loading finished (WORD_SHUTTER_STARTUP_REPORT=1)
+STARTUP_REPORT = os.environ.get("WORD_SHUTTER_STARTUP_REPORT") == "1"
+
+# Rendered text surfaces, shared by falling words and the UI
+text_cache = TextCache(max_size=512)
+
+# Everything below needs pygame to be initialized and is set up by init()
+screen = None
+clock = None
+pacer = None
+dirty_renderer = None
+font_tiny = font_small = font_medium = font_large = None
+input_widget = paused_input_widget = None
+score_widget = level_widget = combo_widget = words_widget = time_widget = None
+
+# Phases of a frame, in order; the simulation phases come from GameState.step
+PROFILE_PHASES = ("events", "input", "difficulty", "spawn", "falling", "particles",
+                  "game_events", "screens", "draw_words", "explosions", "hud",
+                  "overlay", "present", "capture", "pace")
+profiler = FrameProfiler(PROFILE_PHASES)
+show_profiler = PROFILE
+
+# Startup timing, and the loader for the audio and word list; the start
+# screen shows while it runs, and the countdown waits for it if needed
+startup_timer = StartupTimer(LAUNCH_TIME)
+loader = None
+
+# Silent until the background loader has opened the real audio
+audio = NullAudio()
+
+# Frame capture, when enabled
+capture = None
+
+# The game itself, see game_state.py
+state = None
+timestep = FixedTimestep(SIM_RATE)
+
+# Simulation thread of the game in progress in pipelined mode, how many
+# inputs the game has been given in sequential mode, and the latency of
+# those inputs reaching the screen
+simulation = None
+inputs_consumed = 0
+latency = LatencyMeter()
+
+# Recorder for the game in progress, and the recording being played back
+# when running as a replay viewer (see replay.py)
+recorder = None
+replay = None
+
+# Front-end state (unchanged)
 game_over = False
 game_started = False
 game_playing = False
-level = 1
-base_speed = 0.5
-combo = 0
-max_combo = 0
-word_count = 0
-start_time = 0
 countdown = 0
-last_word_spawn = 0
+last_countdown = 0
 paused = False
-pause_time = 0
-pause_duration = 0
-least_time = float('inf')
-current_time_taken = 0
 
-# Explosion particles
-explosions = []
+# Initialize what the start screen needs: the window, fonts and HUD
+# widgets. Audio and the word list are left to the background loader.
+def init():
+    global screen, clock, pacer, dirty_renderer, state, loader
+    global font_tiny, font_small, font_medium, font_large
+    global input_widget, paused_input_widget
+    global score_widget, level_widget, combo_widget, words_widget, time_widget
+    startup_timer.mark("pygame imported")
+    pygame.display.init()
+    pygame.font.init()
 
-# Load high scores from file (unchanged)
-def load_high_scores():
+    clock = pygame.time.Clock()
+    pacer = FramePacer(clock, PACING, FPS)
     try:
-        with open("highscores.json", "r") as f:
-            data = json.load(f)
-            if "score" not in data: data["score"] = 0
-            if "words" not in data: data["words"] = 0
-            if "least_time" not in data: data["least_time"] = float('inf')
-            return data
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), **pacer.display_options(pygame.SCALED))
+    except pygame.error:
+        # No vsync on this display, pace frames ourselves
+        pacer.mode = "capped"
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Word Shutter Typing Game")
+    if DIRTY_RECTS:
+        dirty_renderer = DirtyRectRenderer(screen, DARK_BLUE, threshold=0.5)
+    startup_timer.mark("window open")
+
+    # Fonts - Adjusted sizes to fit better
+    try:
+        font_tiny = pygame.font.Font(None, 20)  # Reduced from 24
+        font_small = pygame.font.Font(None, 28) # Reduced from 36
+        font_medium = pygame.font.Font(None, 36) # Reduced from 48
+        font_large = pygame.font.Font(None, 60)  # Reduced from 72
     except:
-        return {"score": 0, "words": 0, "least_time": float('inf')}
-
-# Save high scores to file (unchanged)
-def save_high_scores(score, words, least_time):
-    with open("highscores.json", "w") as f:
-        json.dump({"score": score, "words": words, "least_time": least_time}, f)
-
-high_scores = load_high_scores()
-high_score = high_scores["score"]
-highest_words_typed = high_scores["words"]
-least_time = high_scores["least_time"]
-
-# Spawn word (unchanged)
-def spawn_word():
-    global word_count, last_word_spawn
-    current_time = time.time()
-    if current_time - last_word_spawn < max(0.5, 2.0 - (level * 0.05)):
+        # Fallback if fonts fail to load
+        font_tiny = pygame.font.SysFont('arial', 16)
+        font_small = pygame.font.SysFont('arial', 20)
+        font_medium = pygame.font.SysFont('arial', 28)
+        font_large = pygame.font.SysFont('arial', 40)
+    startup_timer.mark("fonts loaded")
+
+    # HUD widgets, each re-rendered only when the value it shows changes
+    input_widget = HudWidget(text_cache, font_small, 10, HEIGHT - 60, width=250, height=40, border=LIGHT_BLUE, shadow=DARK_BLUE)
+    paused_input_widget = HudWidget(text_cache, font_small, 10, HEIGHT - 60, width=300, height=40, border=LIGHT_BLUE, shadow=DARK_BLUE)
+    score_widget = HudWidget(text_cache, font_small, WIDTH - 10, 10, anchor="right", shadow=DARK_BLUE)
+    level_widget = HudWidget(text_cache, font_small, 10, 10, shadow=DARK_BLUE)
+    combo_widget = HudWidget(text_cache, font_small, WIDTH - 10, 45, anchor="right", shadow=DARK_BLUE)
+    words_widget = HudWidget(text_cache, font_small, 10, 45, shadow=DARK_BLUE)
+    time_widget = HudWidget(text_cache, font_small, WIDTH//2, 10, anchor="center", shadow=DARK_BLUE)
+
+    state = GameState(
+        WIDTH, HEIGHT,
+        measure_text=measure_word,
+        # TextCache is not thread-safe, so the simulation thread leaves
+        # the sprites to draw_game()
+        make_sprite=None if PIPELINE else word_sprite,
+        stress_words=STRESS_WORDS,
+        # The simulation thread cannot time itself against the frame
+        profiler=None if PIPELINE else profiler,
+    )
+
+    loader = BackgroundLoader(startup_timer)
+    loader.add("audio", load_audio)
+    if WORD_LIST:
+        loader.add("word list", load_word_list)
+    loader.start()
+
+def measure_word(text):
+    return font_medium.size(text)[0]
+
+def word_sprite(text, color):
+    return text_cache.render(text, font_medium, color)
+
+# Open the mixer and decode the sound effects, in the background
+def load_audio():
+    return open_audio(SOUNDS, enabled=AUDIO)
+
+# External word list, loaded in the background. pygame holds the GIL while
+# it measures text, so sharing font_medium with the main thread is safe.
+def load_word_list():
+    # Cached widths are tied to the font, which may be the fallback one
+    font_key = f"{font_medium.get_height()}-{measure_word('abcdefghijklmnopqrstuvwxyz')}"
+    return load_dictionary(WORD_LIST, measure_word, font_key, max_width=WIDTH - 100)
+
+# Take over what the background loader produced; called on the main thread
+# once it is done, and at the latest when the countdown ends
+def finish_loading():
+    global loader, audio
+    loader.wait()
+    if "audio" in loader.results:
+        audio = loader.results["audio"]
+    if "word list" in loader.results:
+        state.dictionary = loader.results["word list"]
+    loader = None
+    startup_timer.mark("assets ready")
+    if STARTUP_REPORT:
+        startup_timer.report()
+
+# Records shown on screen and the session in progress; finished sessions
+# are written in the background, at most every few seconds
+sessions = None
+
+# Typing statistics of the current game, and their summary once it ended
+analytics = TypingAnalytics()
+typing_summary = None
+
+# Save the game that just ended (or was abandoned) to the session history
+def end_session():
+    global typing_summary
+    row = sessions.finish(state)
+    if row is None:
         return
-    
-    word = random.choice(word_pool)
-    word_width = font_medium.size(word)[0]
-    x = random.randint(50, WIDTH - word_width - 50)
-    y = 0
-    
-    if len(word) < 5:
-        color = MINT
-    elif len(word) < 8:
-        color = SKY_BLUE
+    typing_summary = analytics.summary(state.elapsed)
+    if ANALYTICS_PATH:
+        try:
+            append_jsonl(ANALYTICS_PATH, dict(row, **typing_summary))
+        except OSError as e:
+            print(f"Could not write typing analytics to {ANALYTICS_PATH}: {e}", file=sys.stderr)
+
+# Start a new game, recording it, or set up the replay being watched
+def start_game():
+    global recorder, simulation, inputs_consumed
+    stop_recording()
+    if replay is not None:
+        state.word_source = RecordedWords(replay.spawns)
+        state.reset(replay.seed)
     else:
-        color = CORAL
-    
-    speed = base_speed + (level * 0.02) + (len(word) * 0.02)
-    active_words.append({
-        "text": word, 
-        "x": x, 
-        "y": y, 
-        "speed": speed,
-        "color": color,
-        "width": word_width
-    })
-    word_count += 1
-    last_word_spawn = current_time
-
-# Create explosion (unchanged)
-def create_explosion(x, y, color):
-    for _ in range(15):
-        explosions.append({
-            "x": x + random.randint(-20, 20),
-            "y": y + random.randint(-20, 20),
-            "vx": random.uniform(-3, 3),
-            "vy": random.uniform(-8, -2),
-            "life": random.randint(20, 40),
-            "color": color
-        })
-
-# Draw text with shadow (unchanged)
-def draw_text_shadow(text, font, color, x, y):
-    text_width, text_height = font.size(text)
-    shadow = font.render(text, True, DARK_BLUE)
-    screen.blit(shadow, (x+2, y+2))
-    main_text = font.render(text, True, color)
-    screen.blit(main_text, (x, y))
-    return text_width, text_height
+        state.reset()
+        sessions.start()
+        if RECORD_SESSIONS:
+            recorder = SessionRecorder(new_recording_path(REPLAY_DIR), state.seed, SIM_RATE, WIDTH, HEIGHT)
+    analytics.reset()
+    latency.reset()
+    inputs_consumed = 0
+    if PIPELINE and replay is None:
+        simulation = SimulationThread(state, SIM_RATE)
+        simulation.start()
 
-def show_start_screen():
-    screen.fill(DARK_BLUE)
+# Stop the simulation thread, if any, and handle the steps it ran since
+# the last frame; the game state is the main thread's again afterwards
+def stop_simulation():
+    global simulation
+    if simulation is not None:
+        stopped, simulation = simulation, None
+        stopped.stop()
+        for tick, inputs, events in stopped.events():
+            handle_game_events(tick, inputs, events)
+
+# Handle what happened during one simulation step
+def handle_game_events(tick, inputs, events):
+    global game_over
+    if recorder is not None:
+        recorder.step(tick, inputs, events)
+    for kind, data in events:
+        if kind == HIT:
+            audio.play("correct")
+            # The step's own time; in pipelined mode the live state has
+            # moved on since
+            elapsed = (tick + 1) / SIM_RATE
+            analytics.hit(data, elapsed)
+            if replay is None:
+                sessions.word_typed(state, elapsed)
+        elif kind == MISS:
+            audio.play("error")
+            analytics.miss(data)
+        elif kind == GAME_OVER:
+            game_over = True
+            stop_simulation()
+            if replay is None:
+                end_session()
+            stop_recording()
+
+def stop_recording():
+    global recorder
+    if recorder is not None:
+        recorder.close(state)
+        recorder = None
+
+# Pre-made 10x10 particle squares, one per (colour, remaining life)
+particle_sprites = {}
+
+def particle_sprite(palette, color_index, life):
+    # Keyed by the colour itself, as pools may order their palettes differently
+    key = (palette[color_index], life)
+    sprite = particle_sprites.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((10, 10)).convert()
+        sprite.fill(key[0])
+        sprite.set_alpha(min(255, life * 6))
+        particle_sprites[key] = sprite
+    return sprite
+
+# Highlight the typed prefix on every word it matches. `view` is the
+# GameState, or a GameSnapshot of it in pipelined mode (see pipeline.py).
+def draw_typed_prefix(target, view, alpha):
+    targets = view.typed_targets()
+    if not targets:
+        return
+    prefix = text_cache.render(view.input, font_medium, GOLD)
+    target.blits([(prefix, view.words.position(word_id, alpha)) for word_id in targets], False)
+
+# Draw every live particle with one batched blit call
+def draw_explosions(target, view, alpha):
+    particles = view.particles
+    xs, ys, colors, lives = particles.live(alpha)
+    target.blits([(particle_sprite(particles.palette, c, l), (x, y))
+                  for x, y, c, l in zip(xs, ys, colors, lives)], False)
+
+# Draw text with shadow, reusing the composited surface from the cache
+def draw_text_shadow(text, font, color, x, y, target=None):
+    if target is None:
+        target = screen
+    surface = text_cache.render_shadow(text, font, color, DARK_BLUE)
+    target.blit(surface, (x, y))
+    return surface.get_width() - 2, surface.get_height() - 2
+
+def format_best_time(least_time):
+    return f"{least_time:.2f}s" if least_time != float('inf') else "--"
+
+# Static part of the start screen, rebuilt only when the high scores change
+def build_start_screen(high_score, highest_words_typed, least_time):
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill(DARK_BLUE)
     
     # Title with adjusted size and spacing
     title = "WORD SHUTTER"
     subtitle = "TYPING GAME"
     
     # Render title and subtitle separately
-    title_surf = font_large.render(title, True, LIGHT_BLUE)
-    subtitle_surf = font_medium.render(subtitle, True, GOLD)
+    title_surf = text_cache.render(title, font_large, LIGHT_BLUE)
+    subtitle_surf = text_cache.render(subtitle, font_medium, GOLD)
     
     # Center both lines
-    screen.blit(title_surf, (WIDTH//2 - title_surf.get_width()//2, 40))
-    screen.blit(subtitle_surf, (WIDTH//2 - subtitle_surf.get_width()//2, 40 + title_surf.get_height() + 5))
+    surface.blit(title_surf, (WIDTH//2 - title_surf.get_width()//2, 40))
+    surface.blit(subtitle_surf, (WIDTH//2 - subtitle_surf.get_width()//2, 40 + title_surf.get_height() + 5))
     
     # Instructions box with adjusted size
-    pygame.draw.rect(screen, (30, 40, 50), (40, 120, WIDTH-80, 340), border_radius=10)
-    pygame.draw.rect(screen, LIGHT_BLUE, (40, 120, WIDTH-80, 340), 2, border_radius=10)
+    pygame.draw.rect(surface, (30, 40, 50), (40, 120, WIDTH-80, 340), border_radius=10)
+    pygame.draw.rect(surface, LIGHT_BLUE, (40, 120, WIDTH-80, 340), 2, border_radius=10)
     
     # Instructions with adjusted spacing
     instructions = [
@@ -212,21 +414,27 @@ def show_start_screen():
             continue
             
         line_width = font.size(line)[0]
-        draw_text_shadow(line, font, color, WIDTH//2 - line_width//2, y_offset)
+        draw_text_shadow(line, font, color, WIDTH//2 - line_width//2, y_offset, surface)
         y_offset += 22  # Reduced from 25
     
     # High scores in a more compact format
-    hs_text = f"High Score: {high_score} | Words: {highest_words_typed} | Best Time: {least_time if least_time != float('inf') else '--':.2f}s"
+    hs_text = f"High Score: {high_score} | Words: {highest_words_typed} | Best Time: {format_best_time(least_time)}"
     hs_width = font_small.size(hs_text)[0]
     
     # Ensure it fits by reducing font if necessary
     if hs_width > WIDTH - 40:
-        hs_font = pygame.font.Font(None, 20)
+        hs_font = font_tiny
     else:
         hs_font = font_small
     
-    pygame.draw.rect(screen, (20, 30, 40), (WIDTH//2 - hs_width//2 - 10, 470, hs_width + 20, 30), border_radius=5)
-    draw_text_shadow(hs_text, hs_font, GOLD, WIDTH//2 - hs_width//2, 475)
+    pygame.draw.rect(surface, (20, 30, 40), (WIDTH//2 - hs_width//2 - 10, 470, hs_width + 20, 30), border_radius=5)
+    draw_text_shadow(hs_text, hs_font, GOLD, WIDTH//2 - hs_width//2, 475, surface)
+    return surface
+
+start_screen_layer = Layer(build_start_screen)
+
+def show_start_screen():
+    start_screen_layer.draw(screen, (0, 0), sessions.high_score, sessions.highest_words, sessions.least_time)
     
     # Start prompt with blinking effect
     if int(time.time() * 2) % 2 == 0:
@@ -234,33 +442,47 @@ def show_start_screen():
         start_width = font_medium.size(start_text)[0]
         draw_text_shadow(start_text, font_medium, LIME, WIDTH//2 - start_width//2, 520)
 
-def show_countdown():
-    screen.fill(DARK_BLUE)
+# Star field and count for the countdown, rebuilt once per second
+def build_countdown_screen(countdown):
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill(DARK_BLUE)
     
     # Draw stars in background
-    for _ in range(50):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        pygame.draw.circle(screen, WHITE, (x, y), 1)
+    for x, y in countdown_stars:
+        pygame.draw.circle(surface, WHITE, (x, y), 1)
     
     if countdown > 0:
         count_text = str(countdown)
-        count_surf = font_large.render(count_text, True, CORAL)
-        screen.blit(count_surf, (WIDTH//2 - count_surf.get_width()//2, HEIGHT//2 - 50))
+        count_surf = text_cache.render(count_text, font_large, CORAL)
+        surface.blit(count_surf, (WIDTH//2 - count_surf.get_width()//2, HEIGHT//2 - 50))
         
         ready_text = "Get Ready!"
         ready_width = font_medium.size(ready_text)[0]
-        draw_text_shadow(ready_text, font_medium, LAVENDER, WIDTH//2 - ready_width//2, HEIGHT//2 + 20)
+        draw_text_shadow(ready_text, font_medium, LAVENDER, WIDTH//2 - ready_width//2, HEIGHT//2 + 20, surface)
     else:
         go_text = "GO!"
         go_width = font_large.size(go_text)[0]
-        draw_text_shadow(go_text, font_large, LIME, WIDTH//2 - go_width//2, HEIGHT//2 - 50)
+        draw_text_shadow(go_text, font_large, LIME, WIDTH//2 - go_width//2, HEIGHT//2 - 50, surface)
+    return surface
 
-def show_pause_screen():
-    # Darken the game screen
+countdown_stars = [(random.randint(0, WIDTH), random.randint(0, HEIGHT)) for _ in range(50)]
+countdown_layer = Layer(build_countdown_screen)
+
+def show_countdown():
+    countdown_layer.draw(screen, (0, 0), countdown)
+
+# Full-screen dimming overlay for the pause screen
+def build_pause_overlay():
     s = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
     s.fill((0, 0, 0, 180))
-    screen.blit(s, (0, 0))
+    return s
+
+pause_overlay_layer = Layer(build_pause_overlay)
+pause_snapshot = None
+
+def show_pause_screen():
+    # Darken the game screen
+    pause_overlay_layer.draw(screen, (0, 0))
     
     # Paused text
     paused_text = "PAUSED"
@@ -268,7 +490,7 @@ def show_pause_screen():
     draw_text_shadow(paused_text, font_large, GOLD, WIDTH//2 - paused_width//2, HEIGHT//2 - 70)
     
     # Current time - more compact
-    time_text = f"Time: {int(current_time_taken)}s"
+    time_text = f"Time: {int(state.elapsed)}s"
     time_width = font_medium.size(time_text)[0]
     draw_text_shadow(time_text, font_medium, SKY_BLUE, WIDTH//2 - time_width//2, HEIGHT//2 - 20)
     
@@ -282,44 +504,20 @@ def show_pause_screen():
     draw_text_shadow(resume_text, font_medium, LAVENDER, WIDTH//2 - resume_width//2, HEIGHT//2 + 30)
     draw_text_shadow(menu_text, font_medium, SALMON, WIDTH//2 - menu_width//2, HEIGHT//2 + 70)
 
-def reset_game():
-    global score, level, combo, base_speed, active_words
-    global current_input, word_count, max_combo, words_typed, start_time, pause_duration
-    score = 0
-    level = 1
-    combo = 0
-    max_combo = 0
-    base_speed = 0.5
-    active_words = []
-    current_input = ""
-    word_count = 0
-    words_typed = 0
-    start_time = time.time()
-    pause_duration = 0
-    explosions.clear()
-
-def update_difficulty():
-    global base_speed, level, current_time_taken
-    current_time_taken = (time.time() - start_time) - pause_duration
-    
-    if current_time_taken < 30:
-        base_speed = 0.5
-        level = 1
-    else:
-        level = min(20, 1 + int((current_time_taken - 30) / 15))
-        base_speed = 0.5 + (level * 0.02)
-
-def show_game_over_screen():
-    screen.fill(DARK_BLUE)
+# Static part of the game over screen, rebuilt only when the stats change
+def build_game_over_screen(score, words_typed, max_combo, current_time_taken,
+                           high_score, highest_words_typed, level, least_time, typing_lines):
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill(DARK_BLUE)
     
     # Game over text
     game_over_text = "GAME OVER"
     go_width = font_large.size(game_over_text)[0]
-    draw_text_shadow(game_over_text, font_large, CORAL, WIDTH//2 - go_width//2, 50)
+    draw_text_shadow(game_over_text, font_large, CORAL, WIDTH//2 - go_width//2, 50, surface)
     
     # Stats box - made more compact
-    pygame.draw.rect(screen, (30, 40, 50), (50, 120, WIDTH-100, 350), border_radius=10)
-    pygame.draw.rect(screen, LIGHT_BLUE, (50, 120, WIDTH-100, 350), 2, border_radius=10)
+    pygame.draw.rect(surface, (30, 40, 50), (50, 120, WIDTH-100, 350), border_radius=10)
+    pygame.draw.rect(surface, LIGHT_BLUE, (50, 120, WIDTH-100, 350), 2, border_radius=10)
     
     # Stats in two columns to save space
     left_stats = [
@@ -333,7 +531,7 @@ def show_game_over_screen():
         f"High Score: {high_score}",
         f"Best Words: {highest_words_typed}",
         f"Level: {level}",
-        f"Best Time: {least_time if least_time != float('inf') else '--':.2f}s"
+        f"Best Time: {format_best_time(least_time)}"
     ]
     
     left_colors = [LIME, SKY_BLUE, CORAL, TEAL]
@@ -342,215 +540,356 @@ def show_game_over_screen():
     # Left column
     for i, (stat, color) in enumerate(zip(left_stats, left_colors)):
         stat_width = font_medium.size(stat)[0]
-        draw_text_shadow(stat, font_medium, color, WIDTH//2 - 150 - stat_width//2, 140 + i * 50)
+        draw_text_shadow(stat, font_medium, color, WIDTH//2 - 150 - stat_width//2, 140 + i * 50, surface)
     
     # Right column
     for i, (stat, color) in enumerate(zip(right_stats, right_colors)):
         stat_width = font_medium.size(stat)[0]
-        draw_text_shadow(stat, font_medium, color, WIDTH//2 + 150 - stat_width//2, 140 + i * 50)
+        draw_text_shadow(stat, font_medium, color, WIDTH//2 + 150 - stat_width//2, 140 + i * 50, surface)
+
+    # Typing statistics under the columns
+    for i, (line, color) in enumerate(zip(typing_lines, (LAVENDER, SKY_BLUE))):
+        line_width = font_small.size(line)[0]
+        draw_text_shadow(line, font_small, color, WIDTH//2 - line_width//2, 360 + i * 40, surface)
     
-    # Instructions at bottom
-    restart_text = "ENTER: Play Again"
     menu_text = "ESC: Main Menu"
-    
-    rt_width = font_medium.size(restart_text)[0]
     mt_width = font_medium.size(menu_text)[0]
+    draw_text_shadow(menu_text, font_medium, LAVENDER, WIDTH//2 - mt_width//2, 530, surface)
+    return surface
+
+game_over_layer = Layer(build_game_over_screen)
+
+# Game-over lines for a TypingAnalytics summary; none without keystrokes
+def format_typing_summary(summary):
+    if not summary or not summary["keystrokes"]:
+        return ()
+    def ms(seconds):
+        return f"{seconds * 1000:.0f}ms" if seconds is not None else "--"
+    def secs(seconds):
+        return f"{seconds:.1f}s" if seconds is not None else "--"
+    accuracy = f"{summary['accuracy']:.0%}" if summary["accuracy"] is not None else "--"
+    return (
+        f"WPM: {summary['wpm']:.0f} (peak {summary['peak_wpm']:.0f})  |  Accuracy: {accuracy}",
+        f"Key gap: {ms(summary['key_latency_p50'])} (p95 {ms(summary['key_latency_p95'])})  |  "
+        f"Reaction: {secs(summary['reaction_p50'])}",
+    )
+
+def show_game_over_screen():
+    game_over_layer.draw(screen, (0, 0), state.score, state.words_typed, state.max_combo, state.elapsed,
+                         sessions.high_score, sessions.highest_words, state.level, sessions.least_time,
+                         format_typing_summary(typing_summary))
     
     # Blinking effect for restart text
     if int(time.time() * 2) % 2 == 0:
+        restart_text = "ENTER: Play Again"
+        rt_width = font_medium.size(restart_text)[0]
         draw_text_shadow(restart_text, font_medium, LIME, WIDTH//2 - rt_width//2, 480)
-    draw_text_shadow(menu_text, font_medium, LAVENDER, WIDTH//2 - mt_width//2, 530)
+
+# Level progress bar, keyed on the filled width in pixels
+def build_progress_bar(filled):
+    surface = pygame.Surface((104, 12), pygame.SRCALPHA)
+    pygame.draw.rect(surface, (30, 40, 50), (0, 0, 104, 12), border_radius=5)
+    pygame.draw.rect(surface, LIGHT_BLUE, (2, 0, filled, 10), border_radius=5)
+    return surface
+
+progress_layer = Layer(build_progress_bar)
+
+# Draw the words, particles and HUD of the running game in `view`, with
+# moving things `alpha` of the way between the last two simulation steps
+def draw_game(canvas, view, alpha):
+    # Draw game elements
+    canvas.blits(view.words.sprites(alpha, word_sprite), False)
+    draw_typed_prefix(canvas, view, alpha)
+    profiler.lap("draw_words")
+    draw_explosions(canvas, view, alpha)
+    profiler.lap("explosions")
+
+    # Draw UI - made more compact
+    # Input box (smaller)
+    input_widget.draw(canvas, f"Type: {view.input}", LAVENDER)
+    
+    # Score display (top right)
+    score_widget.draw(canvas, f"{view.score}", WHITE)
+    
+    # Level display (top left)
+    level_widget.draw(canvas, f"Lvl {view.level}", WHITE)
+    
+    # Combo display (below score)
+    if view.combo > 0:
+        combo = view.combo
+        combo_color = (min(255, 100 + combo * 10), min(255, 200 + combo * 5), 100)
+        combo_widget.draw(canvas, f"{combo}x", combo_color)
+    
+    # Words typed (below level)
+    words_widget.draw(canvas, f"{view.words_typed}", MINT)
+    
+    # Time played (center top)
+    time_widget.draw(canvas, f"{int(view.elapsed)}s", SKY_BLUE)
+    
+    # Progress to next level (only show after 30s)
+    if view.elapsed > 30:
+        progress = min(1.0, ((view.elapsed - 30) % 15) / 15)
+        progress_layer.draw(canvas, (WIDTH//2 - 52, 50), int(100 * progress))
+    profiler.lap("hud")
+
+# Profiler overlay, refreshed every 15 profiled frames so it stays readable
+def build_profiler_overlay(refresh):
+    lines = [
+        (f"{profiler.fps():.0f} fps", LIME),
+        (f"p50 {profiler.percentile(0.5) * 1000:.1f} ms  p99 {profiler.percentile(0.99) * 1000:.1f} ms", WHITE),
+        (f"words {profiler.counts.get('words', 0)}  particles {profiler.counts.get('particles', 0)}", WHITE),
+    ]
+    if latency.sketch.count:
+        lines.append((f"input to screen p50 {latency.sketch.quantile(0.5) * 1000:.1f} ms", WHITE))
+    slowest = sorted(profiler.phase_means().items(), key=lambda item: item[1], reverse=True)[:5]
+    lines += [(f"{name} {seconds * 1000:.2f} ms", LIGHT_BLUE) for name, seconds in slowest]
+    line_height = font_tiny.get_linesize()
+    surface = pygame.Surface((220, 10 + line_height * len(lines)), pygame.SRCALPHA)
+    surface.fill((0, 0, 0, 170))
+    for i, (text, color) in enumerate(lines):
+        surface.blit(text_cache.render(text, font_tiny, color), (8, 5 + i * line_height))
+    return surface
+
+profiler_overlay_layer = Layer(build_profiler_overlay)
+
+def draw_profiler_overlay(canvas):
+    profiler_overlay_layer.draw(canvas, (WIDTH - 230, 80), profiler.frames // 15)
 
 # Main game loop
-running = True
-while running:
-    current_time = time.time()
-    screen.fill(DARK_BLUE)
-    
-    for event in pygame.event.get():
-        if event.type == QUIT:
-            running = False
-        elif event.type == KEYDOWN:
-            if not game_started:
-                if event.key == K_RETURN:
-                    game_started = True
-                    countdown = 3
-                    last_countdown = current_time
-            elif countdown > 0:
-                pass
-            elif game_over:
-                if event.key == K_RETURN:
-                    game_over = False
-                    game_started = True
-                    countdown = 3
-                elif event.key == K_ESCAPE:
-                    game_over = False
-                    game_started = False
-            else:
-                if event.key == K_ESCAPE:
-                    if not paused:
-                        paused = True
-                        pause_time = current_time
-                        game_playing = False
-                    else:
-                        paused = False
-                        pause_duration += current_time - pause_time
-                        game_playing = True
-                elif paused:
-                    if event.key == K_m:
-                        paused = False
+def main(recording=None):
+    global game_over, game_started, game_playing, countdown, last_countdown, paused, pause_snapshot
+    global sessions, show_profiler
+    global capture, inputs_consumed, replay
+    replay = recording
+    init()
+    if CAPTURE_PATH:
+        capture = FrameCapture(CAPTURE_PATH, (WIDTH, HEIGHT), fps=FPS)
+    sessions = SessionTracker(SESSIONS_PATH)
+    if PROFILE_TRACE:
+        profiler.trace = open_trace(PROFILE_TRACE, PROFILE_PHASES, ("words", "particles"))
+    profiler.enabled = show_profiler or profiler.trace is not None
+
+    running = True
+    first_frame = True
+    frame_time = 0.0
+    inputs = []
+    pause_started = 0
+    # Pauses of the recorded game still to sit out, and when the current
+    # one ends
+    replay_pauses = {}
+    replay_resume_at = None
+    if replay is not None:
+        # Go straight to the countdown of the recorded game
+        game_started = True
+        countdown = 3
+        last_countdown = time.time()
+    while running:
+        current_time = time.time()
+        canvas = screen
+        shown_consumed = None
+        profiler.begin_frame()
+        
+        read = len(inputs)
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                running = False
+            elif event.type == KEYDOWN and event.key == K_F3:
+                show_profiler = not show_profiler
+                profiler.enabled = show_profiler or profiler.trace is not None
+            elif event.type == KEYDOWN:
+                if not game_started:
+                    if event.key == K_RETURN:
+                        game_started = True
+                        countdown = 3
+                        last_countdown = current_time
+                elif countdown > 0:
+                    pass
+                elif game_over:
+                    if event.key == K_RETURN:
+                        game_over = False
+                        game_started = True
+                        countdown = 3
+                    elif event.key == K_ESCAPE:
+                        game_over = False
                         game_started = False
-                        game_playing = False
-                elif event.key == K_RETURN:
-                    matched = False
-                    for word in active_words[:]:
-                        if current_input == word["text"]:
-                            active_words.remove(word)
-                            score += 10 + (len(word["text"]) * 2)
-                            words_typed += 1
-                            combo += 1
-                            if combo > max_combo:
-                                max_combo = combo
-                            matched = True
-                            create_explosion(word["x"] + word["width"]//2, word["y"] + 10, word["color"])
-                            correct_sound.play()
-                            
-                            if combo >= 3:
-                                score += combo * 5
-                            
-                    if matched:
-                        if score > high_score:
-                            high_score = score
-                        if words_typed > highest_words_typed:
-                            highest_words_typed = words_typed
-                        if current_time_taken < least_time:
-                            least_time = current_time_taken
-                        save_high_scores(high_score, highest_words_typed, least_time)
-                    else:
-                        combo = 0
-                        if current_input:
-                            error_sound.play()
-                    current_input = ""
-                elif event.key == K_BACKSPACE:
-                    current_input = current_input[:-1]
                 else:
-                    current_input += event.unicode.lower()
-
-    # Game state management
-    if countdown > 0 and game_started:
-        show_countdown()
-        if current_time - last_countdown > 1:
-            countdown -= 1
-            last_countdown = current_time
-            if countdown > 0:
-                countdown_sound.play()
-        if countdown == 0:
-            reset_game()
+                    if event.key == K_ESCAPE:
+                        if not paused:
+                            if simulation is not None:
+                                # Handle the steps run so far before pausing
+                                simulation.pause()
+                                for tick, tick_inputs, events in simulation.events():
+                                    handle_game_events(tick, tick_inputs, events)
+                            if not game_over:
+                                paused = True
+                                game_playing = False
+                                pause_snapshot = None
+                                pause_started = current_time
+                                if recorder is not None:
+                                    recorder.pause(state.ticks)
+                        else:
+                            paused = False
+                            game_playing = True
+                            replay_resume_at = None
+                            timestep.reset()
+                            if simulation is not None:
+                                simulation.resume()
+                            if recorder is not None:
+                                recorder.resume(state.ticks, current_time - pause_started)
+                    elif paused:
+                        if event.key == K_m:
+                            paused = False
+                            game_started = False
+                            game_playing = False
+                            replay_resume_at = None
+                            stop_simulation()
+                            end_session()
+                            stop_recording()
+                    elif replay is not None:
+                        pass
+                    elif event.key == K_RETURN:
+                        inputs.append(SUBMIT)
+                        analytics.key(SUBMIT, time.perf_counter())
+                    elif event.key == K_BACKSPACE:
+                        inputs.append(BACKSPACE)
+                        analytics.key(BACKSPACE, time.perf_counter())
+                    else:
+                        inputs.append(event.unicode)
+                        if event.unicode:
+                            analytics.key(event.unicode.lower(), time.perf_counter())
+        if len(inputs) > read:
+            latency.typed(len(inputs) - read, time.perf_counter())
+        if simulation is not None and inputs:
+            simulation.push(inputs)
+            inputs = []
+        if replay_resume_at is not None and current_time >= replay_resume_at:
+            # The recorded pause is over
+            paused = False
             game_playing = True
-    elif not game_started:
-        show_start_screen()
-    elif game_over:
-        show_game_over_screen()
-    elif paused:
-        # Draw frozen game state
-        for word in active_words:
-            text_surface = font_medium.render(word["text"], True, word["color"])
-            screen.blit(text_surface, (word["x"], word["y"]))
-        
-        for explosion in explosions:
-            alpha = min(255, explosion["life"] * 6)
-            s = pygame.Surface((10, 10))
-            s.set_alpha(alpha)
-            s.fill(explosion["color"])
-            screen.blit(s, (int(explosion["x"]), int(explosion["y"])))
-        
-        pygame.draw.rect(screen, (30, 40, 50), (10, HEIGHT - 60, 300, 40), border_radius=5)
-        pygame.draw.rect(screen, LIGHT_BLUE, (10, HEIGHT - 60, 300, 40), 2, border_radius=5)
-        draw_text_shadow(f"Type: {current_input}", font_small, LAVENDER, 20, HEIGHT - 55)
-        
-        show_pause_screen()
-    else:
-        update_difficulty()
-        spawn_word()
-
-        # Update words and explosions
-        for word in active_words[:]:
-            word["y"] += word["speed"]
-            if word["y"] > HEIGHT:
-                active_words.remove(word)
-                game_over = True
-                if score > high_score:
-                    high_score = score
-                if words_typed > highest_words_typed:
-                    highest_words_typed = words_typed
-                if current_time_taken < least_time:
-                    least_time = current_time_taken
-                save_high_scores(high_score, highest_words_typed, least_time)
-
-        for explosion in explosions[:]:
-            explosion["x"] += explosion["vx"]
-            explosion["y"] += explosion["vy"]
-            explosion["life"] -= 1
-            if explosion["life"] <= 0:
-                explosions.remove(explosion)
-
-        # Draw game elements
-        for word in active_words:
-            text_surface = font_medium.render(word["text"], True, word["color"])
-            screen.blit(text_surface, (word["x"], word["y"]))
-
-        for explosion in explosions:
-            alpha = min(255, explosion["life"] * 6)
-            s = pygame.Surface((10, 10))
-            s.set_alpha(alpha)
-            s.fill(explosion["color"])
-            screen.blit(s, (int(explosion["x"]), int(explosion["y"])))
-
-        # Draw UI - made more compact
-        # Input box (smaller)
-        pygame.draw.rect(screen, (30, 40, 50), (10, HEIGHT - 60, 250, 40), border_radius=5)
-        pygame.draw.rect(screen, LIGHT_BLUE, (10, HEIGHT - 60, 250, 40), 2, border_radius=5)
-        draw_text_shadow(f"Type: {current_input}", font_small, LAVENDER, 20, HEIGHT - 55)
-        
-        # Score display (top right)
-        score_text = f"{score}"
-        score_width = font_small.size(score_text)[0]
-        pygame.draw.rect(screen, (30, 40, 50), (WIDTH - score_width - 30, 10, score_width + 20, 30), border_radius=5)
-        draw_text_shadow(score_text, font_small, WHITE, WIDTH - score_width - 20, 15)
-        
-        # Level display (top left)
-        level_text = f"Lvl {level}"
-        level_width = font_small.size(level_text)[0]
-        pygame.draw.rect(screen, (30, 40, 50), (10, 10, level_width + 20, 30), border_radius=5)
-        draw_text_shadow(level_text, font_small, WHITE, 20, 15)
-        
-        # Combo display (below score)
-        if combo > 0:
-            combo_text = f"{combo}x"
-            combo_width = font_small.size(combo_text)[0]
-            combo_color = (min(255, 100 + combo * 10), min(255, 200 + combo * 5), 100)
-            pygame.draw.rect(screen, (30, 40, 50), (WIDTH - combo_width - 30, 45, combo_width + 20, 30), border_radius=5)
-            draw_text_shadow(combo_text, font_small, combo_color, WIDTH - combo_width - 20, 50)
-        
-        # Words typed (below level)
-        words_text = f"{words_typed}"
-        words_width = font_small.size(words_text)[0]
-        pygame.draw.rect(screen, (30, 40, 50), (10, 45, words_width + 20, 30), border_radius=5)
-        draw_text_shadow(words_text, font_small, MINT, 20, 50)
-        
-        # Time played (center top)
-        time_text = f"{int(current_time_taken)}s"
-        time_width = font_small.size(time_text)[0]
-        pygame.draw.rect(screen, (30, 40, 50), (WIDTH//2 - time_width//2 - 10, 10, time_width + 20, 30), border_radius=5)
-        draw_text_shadow(time_text, font_small, SKY_BLUE, WIDTH//2 - time_width//2, 15)
-        
-        # Progress to next level (only show after 30s)
-        if current_time_taken > 30:
-            progress = min(1.0, ((current_time_taken - 30) % 15) / 15)
-            pygame.draw.rect(screen, (30, 40, 50), (WIDTH//2 - 52, 50, 104, 12), border_radius=5)
-            pygame.draw.rect(screen, LIGHT_BLUE, (WIDTH//2 - 50, 50, 100 * progress, 10), border_radius=5)
+            replay_resume_at = None
+            timestep.reset()
+        profiler.lap("events")
+
+        # Game state management
+        if countdown > 0 and game_started:
+            show_countdown()
+            if current_time - last_countdown > 1:
+                countdown -= 1
+                last_countdown = current_time
+                if countdown > 0:
+                    audio.play("countdown")
+            if countdown == 0:
+                if loader is not None:
+                    finish_loading()
+                start_game()
+                timestep.reset()
+                inputs = []
+                game_playing = True
+                if replay is not None:
+                    replay_pauses = dict(replay.pauses)
+            profiler.lap("screens")
+        elif not game_started:
+            show_start_screen()
+            profiler.lap("screens")
+        elif game_over:
+            show_game_over_screen()
+            profiler.lap("screens")
+        elif paused:
+            if pause_snapshot is None:
+                # Draw frozen game state once, then reuse it while paused
+                screen.fill(DARK_BLUE)
+                screen.blits(state.words.sprites(timestep.alpha, word_sprite), False)
+                draw_typed_prefix(screen, state, timestep.alpha)
+                draw_explosions(screen, state, timestep.alpha)
+                paused_input_widget.draw(screen, f"Type: {state.input}", LAVENDER)
+                
+                show_pause_screen()
+                pause_snapshot = screen.copy()
+            else:
+                screen.blit(pause_snapshot, (0, 0))
+            profiler.lap("screens")
+        else:
+            if dirty_renderer is not None:
+                canvas = dirty_renderer
+            else:
+                screen.fill(DARK_BLUE)
+
+            if simulation is not None:
+                # Draw the latest step the simulation thread published
+                # and catch up on what happened since the last frame
+                view = simulation.latest
+                alpha = simulation.alpha(view, time.perf_counter())
+                for tick, tick_inputs, events in simulation.events():
+                    handle_game_events(tick, tick_inputs, events)
+                profiler.lap("game_events")
+                shown_consumed = view.consumed
+            else:
+                # Input typed this frame goes to the first step; with no
+                # step due this frame it waits for the next one
+                for _ in range(timestep.advance(frame_time)):
+                    if replay is not None:
+                        if state.ticks in replay_pauses:
+                            # Pause where the player did, for as long
+                            paused = True
+                            game_playing = False
+                            pause_snapshot = None
+                            replay_resume_at = current_time + replay_pauses.pop(state.ticks)
+                            break
+                        inputs = replay.inputs.get(state.ticks, "")
+                    else:
+                        inputs_consumed += len(inputs)
+                    tick = state.ticks
+                    events = state.step(timestep.step, inputs)
+                    handle_game_events(tick, inputs, events)
+                    profiler.lap("game_events")
+                    inputs = []
+                    if replay is not None and state.ticks >= replay.total_ticks:
+                        # The recorded session ended here
+                        game_over = True
+                        break
+                view = state
+                alpha = timestep.alpha
+                shown_consumed = inputs_consumed
+
+            draw_game(canvas, view, alpha)
+
+        if show_profiler:
+            draw_profiler_overlay(canvas)
+            profiler.lap("overlay")
+
+        if canvas is dirty_renderer:
+            dirty_renderer.present()
+        else:
+            if dirty_renderer is not None:
+                dirty_renderer.invalidate()
+            pygame.display.flip()
+        if shown_consumed is not None:
+            latency.presented(shown_consumed, time.perf_counter())
+        profiler.lap("present")
+        if capture is not None:
+            capture.grab(screen)
+            profiler.lap("capture")
+        if first_frame:
+            startup_timer.mark("first frame")
+            first_frame = False
+        if loader is not None and loader.done:
+            finish_loading()
+        frame_time = pacer.tick()
+        profiler.lap("pace")
+        profiler.end_frame(words=len(state.words), particles=state.particles.count)
 
-    pygame.display.flip()
-    clock.tick(60)
+    # A game still running when the window closes counts as played
+    stop_simulation()
+    end_session()
+    stop_recording()
+    profiler.close()
+    sessions.close()
+    audio.close()
+    if capture is not None:
+        capture.close()
+    if LATENCY_REPORT:
+        print(latency.report("pipelined" if PIPELINE else "sequential"), file=sys.stderr)
+    pygame.quit()
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
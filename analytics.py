@@ -0,0 +1,201 @@
+import json
+import math
+
+# Streaming typing analytics
+#
+# Everything here is updated once per keystroke or typed word in O(1) and
+# takes the same memory after ten seconds as after ten hours: rates are
+# kept in fixed rolling windows and timings in fixed-size quantile
+# sketches, never as lists of every event.
+
+
+# Quantile sketch over positive values
+#
+# Values are counted in logarithmic buckets between `low` and `high`, so
+# any quantile can be read back with a relative error of at most
+# `accuracy`; values outside the range land in the first or last bucket.
+class QuantileSketch:
+    def __init__(self, low=0.001, high=120.0, accuracy=0.02):
+        self.low = low
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts = [0] * (int(math.ceil(math.log(high / low) / self._log_gamma)) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        if value <= self.low:
+            bucket = 0
+        else:
+            bucket = min(len(self.counts) - 1, int(math.log(value / self.low) / self._log_gamma))
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += value
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction):
+        if not self.count:
+            return None
+        rank = fraction * (self.count - 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                # Geometric middle of the bucket
+                return self.low * self.gamma ** (bucket + 0.5)
+        return self.low * self.gamma ** len(self.counts)
+
+    def clear(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+
+
+# Sum of amounts added over the last `window` seconds, kept in `buckets`
+# slices of the window
+class RollingCounter:
+    def __init__(self, window=60.0, buckets=60):
+        self.window = window
+        self.width = window / buckets
+        self.buckets = [0] * buckets
+        self.total = 0
+        self._slot = 0
+
+    def _advance(self, t):
+        slot = int(t / self.width)
+        # Clear the slices that fell out of the window since the last call
+        # (at most every slice once, however long ago that was)
+        for s in range(self._slot + 1, min(slot, self._slot + len(self.buckets)) + 1):
+            i = s % len(self.buckets)
+            self.total -= self.buckets[i]
+            self.buckets[i] = 0
+        self._slot = max(self._slot, slot)
+
+    def add(self, t, amount=1):
+        self._advance(t)
+        self.buckets[self._slot % len(self.buckets)] += amount
+        self.total += amount
+
+    def sum(self, t):
+        self._advance(t)
+        return self.total
+
+    def clear(self):
+        self.buckets = [0] * len(self.buckets)
+        self.total = 0
+        self._slot = 0
+
+
+# Typing statistics for one game
+#
+# key() is fed from the KEYDOWN handler with every character, BACKSPACE
+# and SUBMIT as it is pressed; hit() and miss() with the game's HIT and
+# MISS events. Speeds use the usual 5 characters per word.
+#
+#   wpm           correctly typed words (plus ENTER) over the last `window`
+#                 seconds of play
+#   accuracy      share of typed characters that were not erased with
+#                 BACKSPACE or submitted as a miss
+#   key latency   time between keys typed in one go (gaps over
+#                 `burst_gap` are thinking time, not typing)
+#   reaction      time from a word spawning to it being typed
+class TypingAnalytics:
+    MAX_KEYS = 64
+
+    def __init__(self, window=60.0, burst_gap=1.5):
+        self.window = window
+        self.burst_gap = burst_gap
+        self.typed_chars = RollingCounter(window)
+        self.key_latency = QuantileSketch()
+        self.reaction = QuantileSketch()
+        self.reset()
+
+    def reset(self):
+        self.typed_chars.clear()
+        self.key_latency.clear()
+        self.reaction.clear()
+        self.keystrokes = 0
+        self.errors = 0
+        self.hits = 0
+        self.misses = 0
+        self.peak_wpm = 0.0
+        # Per key: [count, total latency]; bounded by MAX_KEYS keys
+        self.per_key = {}
+        self._pending = 0
+        self._last_key = None
+
+    # `ch` is a typed character, or BACKSPACE/SUBMIT from game_state;
+    # `now` is the wall-clock time it was pressed, in seconds
+    def key(self, ch, now, backspace="\b", submit="\r"):
+        if ch == backspace:
+            if self._pending:
+                self._pending -= 1
+                self.errors += 1
+            return
+        if ch == submit:
+            self._pending = 0
+            self._last_key = now
+            return
+        self.keystrokes += 1
+        self._pending += 1
+        if self._last_key is not None and now - self._last_key <= self.burst_gap:
+            latency = now - self._last_key
+            self.key_latency.add(latency)
+            stats = self.per_key.get(ch)
+            if stats is None and len(self.per_key) < self.MAX_KEYS:
+                stats = self.per_key[ch] = [0, 0.0]
+            if stats is not None:
+                stats[0] += 1
+                stats[1] += latency
+        self._last_key = now
+
+    # A word was typed correctly; `word` is the Word from the HIT event
+    # and `elapsed` the game time it happened at
+    def hit(self, word, elapsed):
+        self.hits += 1
+        self.typed_chars.add(elapsed, len(word.text) + 1)
+        if word.speed > 0:
+            self.reaction.add(word.y / word.speed)
+        self.peak_wpm = max(self.peak_wpm, self.wpm(elapsed))
+
+    def miss(self, text):
+        self.misses += 1
+        self.errors += len(text)
+
+    def wpm(self, elapsed):
+        # At least 10 seconds, so one quick word at the start is not a record
+        minutes = min(self.window, max(elapsed, 10.0)) / 60
+        return self.typed_chars.sum(elapsed) / 5 / minutes
+
+    def accuracy(self):
+        if not self.keystrokes:
+            return None
+        return max(0.0, 1 - self.errors / self.keystrokes)
+
+    # Mean latency of the `n` slowest keys, slowest first
+    def slowest_keys(self, n=5, min_count=3):
+        means = [(ch, total / count) for ch, (count, total) in self.per_key.items() if count >= min_count]
+        return sorted(means, key=lambda item: item[1], reverse=True)[:n]
+
+    def summary(self, elapsed):
+        return {
+            "wpm": round(self.wpm(elapsed), 1),
+            "peak_wpm": round(self.peak_wpm, 1),
+            "accuracy": self.accuracy(),
+            "keystrokes": self.keystrokes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "key_latency_p50": self.key_latency.quantile(0.5),
+            "key_latency_p95": self.key_latency.quantile(0.95),
+            "reaction_p50": self.reaction.quantile(0.5),
+            "reaction_p95": self.reaction.quantile(0.95),
+            "slowest_keys": [[ch, round(latency, 4)] for ch, latency in self.slowest_keys()],
+        }
+
+
+# Append one record as a line of JSON to `path`
+def append_jsonl(path, record):
+    with open(path, "a") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
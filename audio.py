@@ -0,0 +1,125 @@
+import queue
+import sys
+import threading
+import time
+
+import pygame
+
+# Sound effects
+#
+# Every sound belongs to a category, and every category owns a fixed set of
+# mixer channels reserved for it, so a burst of hit sounds can only ever
+# cut off other hit sounds, never the countdown or an error buzz. Inside a
+# category a free channel is used if there is one, otherwise the one that
+# has been playing the longest is taken over.
+#
+# play() never touches the mixer itself. It drops repeats of a sound that
+# come closer together than `min_interval` (merging a burst of identical
+# effects into one) and hands the rest to a worker thread, so the frame
+# loop never waits on the audio device.
+
+# Category -> number of reserved channels
+CHANNELS = {"hits": 3, "errors": 1, "ui": 2}
+
+
+class AudioManager:
+    def __init__(self, channels=CHANNELS, min_interval=0.04):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        total = sum(channels.values())
+        pygame.mixer.set_num_channels(max(total, pygame.mixer.get_num_channels()))
+        # Reserved channels are never picked by Sound.play(), only by us
+        pygame.mixer.set_reserved(total)
+        self.pools = {}
+        first = 0
+        for category, count in channels.items():
+            self.pools[category] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            first += count
+        self.min_interval = min_interval
+        self.sounds = {}
+        self.missing = []
+        self.played = 0
+        self.merged = 0
+        self._last_played = {}
+        self._started = {}
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+        self._thread.start()
+
+    # Decode `path` once and keep it as sound `name` in `category`. A
+    # missing or unreadable file is remembered in `missing` and the sound
+    # stays silent.
+    def load(self, name, path, category):
+        if category not in self.pools:
+            raise ValueError(f"unknown sound category {category!r}")
+        try:
+            sound = pygame.mixer.Sound(path)
+        except (FileNotFoundError, pygame.error):
+            self.missing.append(path)
+            sound = None
+        self.sounds[name] = (sound, category)
+
+    def play(self, name):
+        now = time.monotonic()
+        if now - self._last_played.get(name, float('-inf')) < self.min_interval:
+            self.merged += 1
+            return
+        self._last_played[name] = now
+        self._queue.put(name)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            name = self._queue.get()
+            if name is None:
+                return
+            sound, category = self.sounds.get(name, (None, None))
+            if sound is None:
+                continue
+            pool = self.pools[category]
+            channel = next((c for c in pool if not c.get_busy()), None)
+            if channel is None:
+                channel = min(pool, key=lambda c: self._started.get(c, 0.0))
+            channel.play(sound)
+            self._started[channel] = time.monotonic()
+            self.played += 1
+
+
+# Stand-in with the same interface that never makes a sound, for headless
+# runs, machines without audio, and before the real one has loaded
+class NullAudio:
+    def __init__(self):
+        self.sounds = {}
+        self.missing = []
+        self.played = 0
+        self.merged = 0
+
+    def load(self, name, path, category):
+        self.sounds[name] = (None, category)
+
+    def play(self, name):
+        pass
+
+    def close(self):
+        pass
+
+
+# AudioManager with `sounds` ({name: (path, category)}) loaded, or
+# NullAudio if audio is disabled or the mixer cannot be opened
+def open_audio(sounds, enabled=True):
+    audio = None
+    if enabled:
+        try:
+            audio = AudioManager()
+        except Exception as e:
+            print(f"Audio unavailable, playing without sound: {e}", file=sys.stderr)
+    if audio is None:
+        audio = NullAudio()
+    for name, (path, category) in sounds.items():
+        audio.load(name, path, category)
+    if audio.missing:
+        print(f"Sound files not found, playing without them: {', '.join(audio.missing)}", file=sys.stderr)
+    return audio
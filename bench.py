@@ -0,0 +1,334 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Headless benchmarks
+#
+# Runs fixed scenarios of the real game code on SDL's dummy video and
+# audio drivers, so the numbers do not depend on a window or sound card:
+#
+#   words_<n>         a frame of play with n words falling: step, draw, flip
+#   explosions        five explosion bursts a frame, updated and drawn
+#   hud               the HUD with its score changing every frame
+#   start_screen,
+#   pause_screen,
+#   game_over_screen  the menu screens, as drawn every frame they show
+#   enter_<n>         typing a word and pressing ENTER with n words live
+#   session_save      handing a finished game to the session writer, as
+#                     the game does at game over
+#
+# Every scenario is timed for --frames frames after a warm-up, then run
+# again under tracemalloc to count what it allocates. Results are written
+# as JSON and compared with a baseline from an earlier run (bench.py
+# --save-baseline); anything slower or allocating more than the tolerance
+# allows is listed and the exit status is 1. No reference baseline is
+# committed, since timings only compare on the machine they were taken
+# on: a missing baseline is an error too, unless --allow-missing-baseline
+# is given.
+
+BASELINE_FILE = "bench_baseline.json"
+WARMUP_FRAMES = 30
+ALLOC_FRAMES = 60
+
+# Timing differences smaller than this are noise, whatever the tolerance
+MIN_REGRESSION_MS = 0.02
+
+# The game reads its settings when it is imported, so these must be set
+# first
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ["WORD_SHUTTER_AUDIO"] = "0"
+os.environ["WORD_SHUTTER_RECORD"] = "0"
+for name in ("WORD_SHUTTER_PIPELINE", "WORD_SHUTTER_DIRTY_RECTS", "WORD_SHUTTER_STRESS",
+             "WORD_SHUTTER_PROFILE", "WORD_SHUTTER_PROFILE_TRACE", "WORD_SHUTTER_CAPTURE"):
+    os.environ.pop(name, None)
+
+import pygame
+
+import Game
+from game_state import SUBMIT
+from history import SESSIONS_DB, SessionTracker, SessionWriter, session_row
+
+DT = 1.0 / Game.SIM_RATE
+
+
+# Fill the game with `n` words spread over the screen; stress mode keeps
+# the count topped up as words are typed or fall out
+def fill_words(n):
+    state = Game.state
+    state.reset(seed=n)
+    state.stress_words = n
+    # One word spawns per step; a few more seconds spread them out
+    for _ in range(n + 5 * Game.SIM_RATE):
+        state.step(DT)
+
+
+def words_scenario(n):
+    def setup():
+        fill_words(n)
+
+    def frame():
+        Game.state.step(DT)
+        Game.screen.fill(Game.DARK_BLUE)
+        Game.draw_game(Game.screen, Game.state, 0.5)
+        pygame.display.flip()
+    return setup, frame
+
+
+def explosions_scenario():
+    rng = random.Random(1)
+
+    def setup():
+        Game.state.reset(seed=1)
+        Game.state.stress_words = 0
+
+    def frame():
+        state = Game.state
+        for _ in range(5):
+            state.create_explosion(rng.randint(50, Game.WIDTH - 50), rng.randint(50, Game.HEIGHT - 50),
+                                   rng.choice((Game.MINT, Game.SKY_BLUE, Game.CORAL)))
+        state.particles.update(DT, bounds=(Game.WIDTH, Game.HEIGHT))
+        Game.screen.fill(Game.DARK_BLUE)
+        Game.draw_explosions(Game.screen, state, 0.5)
+        pygame.display.flip()
+    return setup, frame
+
+
+def hud_scenario():
+    def setup():
+        Game.state.reset(seed=1)
+        Game.state.stress_words = 0
+        Game.state.elapsed = 45.0
+        Game.state.combo = 4
+
+    def frame():
+        state = Game.state
+        state.score += 10
+        Game.screen.fill(Game.DARK_BLUE)
+        Game.draw_game(Game.screen, state, 0.5)
+        pygame.display.flip()
+    return setup, frame
+
+
+def screen_scenario(show):
+    def setup():
+        state = Game.state
+        state.reset(seed=1)
+        state.stress_words = 0
+        state.score, state.words_typed, state.max_combo, state.elapsed = 1234, 42, 9, 95.5
+
+    def frame():
+        Game.screen.fill(Game.DARK_BLUE)
+        show()
+        pygame.display.flip()
+    return setup, frame
+
+
+def enter_scenario(n):
+    rng = random.Random(n)
+
+    def setup():
+        fill_words(n)
+
+    def frame():
+        state = Game.state
+        text = state.words.text[rng.randrange(len(state.words))]
+        state.step(DT, text + SUBMIT)
+    return setup, frame
+
+
+def session_save_scenario():
+    writer = None
+
+    def setup():
+        nonlocal writer
+        writer = SessionWriter(Game.SESSIONS_PATH, interval=5.0)
+
+    def frame():
+        writer.submit(session_row("bench", time.time(), 60.0, 1000, 30, 5, 3, 2.5))
+        writer.flush()
+
+    def teardown():
+        writer.close()
+    return setup, frame, teardown
+
+
+def scenarios(word_counts):
+    table = {}
+    for n in word_counts:
+        table[f"words_{n}"] = words_scenario(n)
+    table["explosions"] = explosions_scenario()
+    table["hud"] = hud_scenario()
+    table["start_screen"] = screen_scenario(Game.show_start_screen)
+    table["pause_screen"] = screen_scenario(Game.show_pause_screen)
+    table["game_over_screen"] = screen_scenario(Game.show_game_over_screen)
+    for n in word_counts:
+        table[f"enter_{n}"] = enter_scenario(n)
+    table["session_save"] = session_save_scenario()
+    return table
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# Time `frames` frames `repeat` times. Each statistic is the best of the
+# rounds, as the best round is the one least disturbed by the rest of
+# the machine.
+def run_scenario(setup, frame, teardown=None, frames=300, repeat=3):
+    gc.collect()
+    setup()
+    start = time.perf_counter()
+    frame()
+    first = time.perf_counter() - start
+    for _ in range(WARMUP_FRAMES):
+        frame()
+
+    rounds = []
+    clock = time.perf_counter
+    for _ in range(repeat):
+        times = []
+        for _ in range(frames):
+            start = clock()
+            frame()
+            times.append(clock() - start)
+        rounds.append(sorted(times))
+
+    # Allocations: how far Python's traced memory peaks above where the
+    # frame started (memory allocated and freed within the frame counts),
+    # and how many blocks the frames keep alive afterwards
+    tracemalloc.start()
+    peaks = 0
+    blocks = sys.getallocatedblocks()
+    for _ in range(ALLOC_FRAMES):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        frame()
+        peaks += tracemalloc.get_traced_memory()[1] - before
+    retained = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    if teardown is not None:
+        teardown()
+
+    return {
+        "fps": round(max(frames / sum(times) for times in rounds), 1),
+        "frame_ms": {name: round(min(percentile(times, fraction) for times in rounds) * 1000, 4)
+                     for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "max_ms": round(min(times[-1] for times in rounds) * 1000, 4),
+        "first_ms": round(first * 1000, 4),
+        "alloc_bytes_per_frame": round(peaks / ALLOC_FRAMES),
+        "retained_blocks_per_frame": round(retained / ALLOC_FRAMES, 2),
+    }
+
+
+def slower(result_ms, base_ms, tolerance):
+    return result_ms > base_ms * (1 + tolerance) and result_ms - base_ms > MIN_REGRESSION_MS
+
+
+# (scenario, metric, baseline, result) for every result worse than the
+# baseline by more than `tolerance`, or twice that for p95 frame times,
+# which vary more. fps is a mean and swings with a single stall, so the
+# median and p95 are what is checked. Timings must also be worse by more than
+# MIN_REGRESSION_MS, and allocations by more than a kilobyte.
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, allowed in (("p50", tolerance), ("p95", 2 * tolerance)):
+            if slower(result["frame_ms"][metric], base["frame_ms"][metric], allowed):
+                found.append((name, f"frame_ms.{metric}", base["frame_ms"][metric], result["frame_ms"][metric]))
+        if result["alloc_bytes_per_frame"] > base["alloc_bytes_per_frame"] * (1 + tolerance) + 1024:
+            found.append((name, "alloc_bytes_per_frame", base["alloc_bytes_per_frame"],
+                          result["alloc_bytes_per_frame"]))
+        if result["retained_blocks_per_frame"] > base["retained_blocks_per_frame"] + 0.5:
+            found.append((name, "retained_blocks_per_frame", base["retained_blocks_per_frame"],
+                          result["retained_blocks_per_frame"]))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game headless and check for regressions.")
+    parser.add_argument("--frames", type=int, default=300, help="timed frames per scenario and round")
+    parser.add_argument("--repeat", type=int, default=3, help="timed rounds per scenario; the fastest counts")
+    parser.add_argument("--words", type=int, nargs="+", default=[20, 100, 400],
+                        help="word counts for the words_<n> and enter_<n> scenarios")
+    parser.add_argument("--only", nargs="+", help="run only these scenarios")
+    parser.add_argument("--out", default="bench-results.json", help="where to write the results")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--allow-missing-baseline", action="store_true",
+                        help="exit with status 0 when there is no baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="how much worse than the baseline a result may be (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    Game.init()
+    Game.finish_loading()
+    table = scenarios(args.words)
+    if args.only:
+        unknown = set(args.only) - set(table)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}; choose from {', '.join(table)}")
+        table = {name: table[name] for name in args.only}
+
+    results = {}
+    # Sessions saved by the benchmark go to a throwaway database
+    with tempfile.TemporaryDirectory(prefix="word-shutter-bench-") as directory:
+        Game.SESSIONS_PATH = os.path.join(directory, SESSIONS_DB)
+        # The menu screens show the records
+        Game.sessions = SessionTracker(Game.SESSIONS_PATH)
+        try:
+            for name, scenario in table.items():
+                results[name] = result = run_scenario(*scenario, frames=args.frames, repeat=args.repeat)
+                print(f"{name:<18} {result['fps']:>10.1f} fps  p50 {result['frame_ms']['p50']:8.3f} ms  "
+                      f"p95 {result['frame_ms']['p95']:8.3f} ms  {result['alloc_bytes_per_frame']:>8} B/frame  "
+                      f"{result['retained_blocks_per_frame']:>6} blocks kept/frame")
+        finally:
+            Game.sessions.close()
+    pygame.quit()
+
+    report = {
+        "machine": {"python": platform.python_version(), "pygame": pygame.version.ver,
+                    "sdl": ".".join(map(str, pygame.get_sdl_version())), "platform": platform.platform(),
+                    "video_driver": os.environ["SDL_VIDEODRIVER"]},
+        "frames": args.frames,
+        "repeat": args.repeat,
+        "scenarios": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one", file=sys.stderr)
+        return 0 if args.allow_missing_baseline else 1
+    if baseline.get("machine") != report["machine"]:
+        print("Warning: the baseline was recorded on a different machine or setup", file=sys.stderr)
+    found = regressions(results, baseline["scenarios"], args.tolerance)
+    if found:
+        print(f"\nREGRESSIONS ({len(found)}) against {args.baseline}:", file=sys.stderr)
+        for name, metric, base, result in found:
+            print(f"  {name}: {metric} {base} -> {result}", file=sys.stderr)
+        return 1
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game_state import GameState, DifficultyCurve, BACKSPACE, SUBMIT
+
+# Batch simulation of bot players, for tuning the difficulty curve
+#
+# Each game is a headless GameState played by a simulated typist: it
+# waits a reaction time, then types the word closest to the bottom one
+# key at a time at its WPM, sometimes hitting a wrong key and correcting
+# it with BACKSPACE, and presses ENTER. Games are spread over a process
+# pool, and the results are aggregated per typist profile: survival time,
+# score and how far players get through the levels.
+
+SIM_RATE = 60
+
+
+class Typist:
+    def __init__(self, wpm=50, error_rate=0.03, reaction=0.35, jitter=0.25, rng=None):
+        # A word is 5 keystrokes when counting WPM
+        self.key_time = 60.0 / (wpm * 5)
+        self.error_rate = error_rate
+        self.reaction = reaction
+        self.jitter = jitter
+        self.rng = rng if rng is not None else random.Random()
+        self.target = None
+        self.keys = []
+        self.next_key = 0.0
+
+    def _delay(self, seconds):
+        return seconds * (1.0 + self.rng.uniform(-self.jitter, self.jitter))
+
+    # Keys pressed during the step that ends at `state.elapsed + dt`
+    def inputs(self, state, dt):
+        now = state.elapsed + dt
+        if self.target is not None and self.target not in state.words:
+            # The word is gone (it should not be, but never type into nothing)
+            self.target = None
+            self.keys = []
+        if self.target is None:
+            word_id = state.words.lowest()
+            if word_id is None:
+                return ""
+            self.target = word_id
+            self.keys = self._keystrokes(state.words.get(word_id).text)
+            self.next_key = now + self._delay(self.reaction)
+
+        typed = []
+        while self.keys and self.next_key <= now:
+            typed.append(self.keys.pop(0))
+            self.next_key += self._delay(self.key_time)
+        if not self.keys:
+            self.target = None
+        return "".join(typed)
+
+    def _keystrokes(self, text):
+        keys = []
+        for ch in text:
+            if self.rng.random() < self.error_rate:
+                keys += [self.rng.choice("abcdefghijklmnopqrstuvwxyz"), BACKSPACE]
+            keys.append(ch)
+        keys.append(SUBMIT)
+        return keys
+
+
+# Play one game to the end (or `max_time` seconds) and return its stats
+def play_game(seed, wpm, error_rate, curve_params=None, max_time=900.0):
+    curve = DifficultyCurve.from_dict(curve_params) if curve_params else DifficultyCurve()
+    state = GameState(seed=seed, curve=curve)
+    typist = Typist(wpm, error_rate, rng=random.Random(seed ^ 0x5EED))
+    dt = 1.0 / SIM_RATE
+    max_ticks = int(max_time * SIM_RATE)
+    while not state.game_over and state.ticks < max_ticks:
+        state.step(dt, typist.inputs(state, dt))
+    return {
+        "seed": seed, "wpm": wpm, "error_rate": error_rate,
+        "survival": round(state.elapsed, 3), "score": state.score, "level": state.level,
+        "words": state.words_typed, "max_combo": state.max_combo, "survived": not state.game_over,
+    }
+
+
+def _play_batch(jobs):
+    return [play_game(*job) for job in jobs]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# One summary row per (wpm, error rate) profile
+def aggregate(games, max_level):
+    groups = {}
+    for game in games:
+        groups.setdefault((game["wpm"], game["error_rate"]), []).append(game)
+    rows = []
+    for (wpm, error_rate), group in sorted(groups.items()):
+        row = {"wpm": wpm, "error_rate": error_rate, "games": len(group),
+               "survived": sum(g["survived"] for g in group) / len(group)}
+        for field in ("survival", "score", "words", "level"):
+            values = [g[field] for g in group]
+            row[f"{field}_mean"] = round(sum(values) / len(values), 3)
+            for name, fraction in (("p10", 0.1), ("p50", 0.5), ("p90", 0.9)):
+                row[f"{field}_{name}"] = percentile(values, fraction)
+        # Share of games that ended on each level
+        for level in range(1, max_level + 1):
+            row[f"level_{level}"] = round(sum(1 for g in group if g["level"] == level) / len(group), 4)
+        rows.append(row)
+    return rows
+
+
+def is_parquet(path):
+    return path.lower().endswith(".parquet")
+
+
+# pyarrow is only needed for Parquet output, so it is imported on demand
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Writing Parquet needs pyarrow (pip install pyarrow), or use a .csv path")
+    return pyarrow
+
+
+# Write `rows` (dicts with the same keys) to CSV, or to Parquet when the
+# path ends in .parquet
+def write_rows(rows, path):
+    if is_parquet(path):
+        pyarrow = import_pyarrow()
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate bot players to tune the difficulty curve.")
+    parser.add_argument("--games", type=int, default=200, help="games per typist profile")
+    parser.add_argument("--wpm", type=float, nargs="+", default=[30, 50, 70], help="typing speeds to simulate")
+    parser.add_argument("--errors", type=float, nargs="+", default=[0.03],
+                        help="chance of a wrong key per letter, one profile per value")
+    parser.add_argument("--curve", help="JSON file with DifficultyCurve parameters to override")
+    parser.add_argument("--max-time", type=float, default=900.0, help="stop games that last this long")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--seed", type=int, default=1, help="first game seed")
+    parser.add_argument("--out", default="botsim-summary.csv", help="summary per profile (.csv or .parquet)")
+    parser.add_argument("--games-out", help="also write every game (.csv or .parquet)")
+    args = parser.parse_args(argv)
+    if any(path and is_parquet(path) for path in (args.out, args.games_out)):
+        # Fail before hours of simulation, not after
+        import_pyarrow()
+
+    curve_params = None
+    if args.curve:
+        with open(args.curve, "r") as f:
+            curve_params = json.load(f)
+    max_level = DifficultyCurve.from_dict(curve_params or {}).max_level
+
+    jobs = [(args.seed + i, wpm, error_rate, curve_params, args.max_time)
+            for wpm in args.wpm for error_rate in args.errors for i in range(args.games)]
+    # Batches keep the per-task overhead small without starving workers
+    batch = max(1, math.ceil(len(jobs) / (args.workers * 8)))
+    batches = [jobs[i:i + batch] for i in range(0, len(jobs), batch)]
+
+    start = time.perf_counter()
+    games = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for results in pool.map(_play_batch, batches):
+            games.extend(results)
+    elapsed = time.perf_counter() - start
+
+    summary = aggregate(games, max_level)
+    write_rows(summary, args.out)
+    if args.games_out:
+        write_rows(games, args.games_out)
+
+    print(f"{len(games)} games in {elapsed:.1f}s with {args.workers} workers")
+    for row in summary:
+        print(f"  {row['wpm']:>5.0f} wpm, {row['error_rate']:.0%} errors: survival p50 {row['survival_p50']:.0f}s, "
+              f"score p50 {row['score_p50']}, level p50 {row['level_p50']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+from multiprocessing import shared_memory
+
+import pygame
+
+# Gameplay capture
+#
+# Frames are copied out of the screen into a ring of preallocated frame
+# buffers in shared memory and encoded by a separate writer process, so
+# neither the copy's memory nor the encoding ever lands on the frame loop.
+# Each buffer is wrapped in a pygame surface once at start-up; grabbing a
+# frame is a single blit into the next free buffer. When all buffers are
+# still waiting to be written the frame is dropped and counted instead.
+#
+# The output format follows the path:
+#   frames/frame_%06d.png   one image per frame (also .bmp/.tga/.jpg)
+#   session.rgb             raw RGBX frames back to back, for ffmpeg
+#                           -f rawvideo -pix_fmt rgb0 -s WxH -r FPS -i session.rgb
+#   session.mp4             piped straight into ffmpeg (any extension
+#                           ffmpeg can write; ffmpeg must be on PATH)
+#
+# Dropped frames are missing from the output, so a capture with drops
+# plays back slightly fast.
+
+IMAGE_FORMATS = (".png", ".bmp", ".tga", ".jpg", ".jpeg")
+RAW_FORMATS = (".rgb", ".raw")
+
+
+def output_kind(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in IMAGE_FORMATS:
+        return "images"
+    if extension in RAW_FORMATS:
+        return "raw"
+    return "ffmpeg"
+
+
+def ffmpeg_command(path, size, fps):
+    return ["ffmpeg", "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb0",
+            "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-", "-pix_fmt", "yuv420p", path]
+
+
+class FrameCapture:
+    def __init__(self, path, size, fps=60, slots=8):
+        self.path = path
+        self.size = size
+        self.kind = output_kind(path)
+        if self.kind == "images" and "%" not in path:
+            raise ValueError(f"image sequence path needs a frame number pattern, e.g. frame_%06d.png: {path}")
+        if self.kind == "ffmpeg" and shutil.which("ffmpeg") is None:
+            raise ValueError(f"capturing to {path} needs ffmpeg on PATH; use a .rgb or .png path instead")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.frames = 0
+        self.dropped = 0
+        frame_bytes = size[0] * size[1] * 4
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+        self._surfaces = [pygame.image.frombuffer(self._shm.buf[i * frame_bytes:(i + 1) * frame_bytes], size, "RGBX")
+                          for i in range(slots)]
+        self._free = list(range(slots))
+        # The writer is a fresh process, not a fork of one running SDL
+        context = multiprocessing.get_context("spawn")
+        self._filled = context.Queue()
+        self._returned = context.Queue()
+        self._writer = context.Process(
+            target=_write_frames, name="frame-writer", daemon=True,
+            args=(self._shm.name, slots, size, path, self.kind, fps, self._filled, self._returned))
+        self._writer.start()
+
+    # Copy `surface` into the next free buffer, or drop the frame if the
+    # writer has not handed any back yet
+    def grab(self, surface):
+        try:
+            while True:
+                self._free.append(self._returned.get_nowait())
+        except queue.Empty:
+            pass
+        if not self._free:
+            self.dropped += 1
+            return False
+        slot = self._free.pop()
+        self._surfaces[slot].blit(surface, (0, 0))
+        self._filled.put((slot, self.frames))
+        self.frames += 1
+        return True
+
+    # Wait for the writer to finish the frames it has, then release the
+    # shared memory
+    def close(self, timeout=30.0):
+        self._filled.put(None)
+        self._writer.join(timeout)
+        if self._writer.is_alive():
+            self._writer.terminate()
+        self._surfaces = []
+        self._shm.close()
+        self._shm.unlink()
+        print(f"Captured {self.frames} frames to {self.path}, dropped {self.dropped}", file=sys.stderr)
+
+
+def _write_frames(shm_name, slots, size, path, kind, fps, filled, returned):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frame_bytes = size[0] * size[1] * 4
+    out = encoder = None
+    if kind == "raw":
+        out = open(path, "wb")
+    elif kind == "ffmpeg":
+        encoder = subprocess.Popen(ffmpeg_command(path, size, fps), stdin=subprocess.PIPE)
+        out = encoder.stdin
+    try:
+        while True:
+            item = filled.get()
+            if item is None:
+                break
+            slot, number = item
+            view = shm.buf[slot * frame_bytes:(slot + 1) * frame_bytes]
+            try:
+                if kind == "images":
+                    pygame.image.save(pygame.image.frombuffer(view, size, "RGBX"), path % number)
+                else:
+                    out.write(view)
+            finally:
+                view.release()
+            returned.put(slot)
+    except (OSError, pygame.error) as e:
+        # Stop writing; the game keeps running and drops every later frame
+        print(f"Frame capture stopped: {e}", file=sys.stderr)
+    finally:
+        if out is not None:
+            try:
+                out.close()
+            except OSError:
+                pass
+        if encoder is not None:
+            encoder.wait()
+        shm.close()
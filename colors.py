@@ -0,0 +1,14 @@
+# New Color Palette
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+DARK_BLUE = (13, 19, 33)
+LIGHT_BLUE = (100, 149, 237)
+TEAL = (0, 128, 128)
+GOLD = (255, 215, 0)
+CORAL = (255, 127, 80)
+LAVENDER = (230, 230, 250)
+MINT = (189, 252, 201)
+SALMON = (250, 128, 114)
+PURPLE = (147, 112, 219)
+LIME = (50, 205, 50)
+SKY_BLUE = (135, 206, 235)
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+
+# External word lists with a precomputed, disk-cached index
+#
+# A word list is a UTF-8 text file with one word per line (blank lines and
+# lines starting with # are skipped). The first time a list is used with a
+# given font, every word is measured once and the list is written to a
+# cache directory as flat NumPy arrays, grouped into buckets by length and
+# difficulty tier:
+#
+#   chars.npy    all words' UTF-8 bytes, back to back, in bucket order
+#   offsets.npy  start of each word in chars (one extra entry at the end)
+#   widths.npy   width of each word in pixels
+#   buckets.npy  (length, tier, first word, word count) per bucket
+#   meta.json    what the cache was built from, to detect stale caches
+#
+# Later runs memory-map those arrays, so startup cost does not grow with
+# the size of the list. Sampling first picks a bucket with an alias table
+# weighted for the current level, then a word inside it: O(1) per spawn.
+
+MAX_LEVEL = 20
+CACHE_VERSION = 1
+
+# Letters that are awkward to reach or rarely typed; a word's difficulty
+# tier is how many of these it has (0, 1, or 2 and more), and anything
+# that is not a plain a-z letter counts as hard as well
+HARD_LETTERS = set("bjkqvwxyz")
+TIERS = 3
+
+
+def difficulty_tier(word):
+    hard = sum(1 for ch in word if ch in HARD_LETTERS or not "a" <= ch <= "z")
+    return min(TIERS - 1, hard)
+
+
+# Relative chance of a word of `length` letters and `tier` at `level`:
+# the preferred length grows from about 4 letters at level 1 to 11 at
+# level 20, and harder tiers are held back until later levels
+def level_weight(level, length, tier):
+    target = 4 + level * 0.35
+    weight = math.exp(-((length - target) ** 2) / (2 * 2.5 ** 2))
+    return weight * 0.25 ** max(0, tier - (level - 1) // 7)
+
+
+# Walker/Vose alias table for O(1) sampling from fixed weights
+class AliasTable:
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.probability = [0.0] * n
+        self.alias = [0] * n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.probability[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def sample(self, rng):
+        i = int(rng.random() * len(self.alias))
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+
+class WordDictionary:
+    def __init__(self, chars, offsets, widths, buckets):
+        self.chars = chars
+        self.offsets = offsets
+        self.widths = widths
+        self.buckets = buckets
+        # Bucket bounds as plain ints; indexing memory-mapped arrays one
+        # element at a time is much slower than a Python list
+        self._starts = buckets[:, 2].tolist()
+        self._counts = buckets[:, 3].tolist()
+        self._tables = {}
+        for level in range(1, MAX_LEVEL + 1):
+            weights = [count * level_weight(level, int(length), int(tier))
+                       for length, tier, _, count in buckets.tolist()]
+            if sum(weights) == 0:
+                weights = [count for count in self._counts]
+            self._tables[level] = AliasTable(weights)
+
+    def __len__(self):
+        return len(self.widths)
+
+    def word(self, i):
+        return self.chars[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    # (word, width) drawn for `level` using `rng` (a random.Random)
+    def sample(self, level, rng):
+        table = self._tables[max(1, min(MAX_LEVEL, level))]
+        bucket = table.sample(rng)
+        i = self._starts[bucket] + int(rng.random() * self._counts[bucket])
+        return self.word(i), int(self.widths[i])
+
+    # Build an index from an in-memory list of words
+    @classmethod
+    def from_words(cls, words, measure_text, max_width=None):
+        return cls(*build_index(words, measure_text, max_width))
+
+
+def read_word_list(path):
+    words = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            word = line.strip().lower()
+            if not word or word.startswith("#") or any(ch.isspace() for ch in word):
+                continue
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+    return words
+
+
+# Measure, bucket and pack `words` into the flat index arrays
+def build_index(words, measure_text, max_width=None):
+    entries = []
+    for word in dict.fromkeys(words):
+        width = measure_text(word)
+        if max_width is not None and width > max_width:
+            continue
+        encoded = word.encode("utf-8")
+        entries.append((len(word), difficulty_tier(word), encoded, width))
+    if not entries:
+        raise ValueError("word list has no usable words")
+    entries.sort(key=lambda e: (e[0], e[1]))
+
+    lengths = [len(e[2]) for e in entries]
+    offsets = np.zeros(len(entries) + 1, dtype=np.uint32)
+    np.cumsum(lengths, out=offsets[1:])
+    chars = np.frombuffer(b"".join(e[2] for e in entries), dtype=np.uint8)
+    widths = np.array([e[3] for e in entries], dtype=np.uint16)
+
+    buckets = []
+    for i, (length, tier, _, _) in enumerate(entries):
+        if buckets and buckets[-1][0] == length and buckets[-1][1] == tier:
+            buckets[-1][3] += 1
+        else:
+            buckets.append([length, tier, i, 1])
+    return chars, offsets, widths, np.array(buckets, dtype=np.uint32)
+
+
+def default_cache_dir(path, font_key, max_width):
+    digest = hashlib.sha1(f"{os.path.abspath(path)}|{font_key}|{max_width}".encode()).hexdigest()[:16]
+    return os.path.join(os.path.dirname(os.path.abspath(path)), ".wordcache", digest)
+
+
+# Load a word list through its on-disk index, building the index first if
+# it is missing or older than the list. `font_key` names the font used by
+# `measure_text`, since the cached widths are only valid for that font.
+def load_dictionary(path, measure_text, font_key, max_width=None, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = default_cache_dir(path, font_key, max_width)
+    stat = os.stat(path)
+    meta = {
+        "version": CACHE_VERSION,
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime_ns,
+        "font": font_key,
+        "max_width": max_width,
+    }
+    names = ("chars", "offsets", "widths", "buckets")
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), "r") as f:
+            cached = json.load(f) == meta
+    except (OSError, ValueError):
+        cached = False
+
+    if cached:
+        try:
+            arrays = [np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode="r") for name in names]
+            return WordDictionary(*arrays)
+        except (OSError, ValueError):
+            pass
+
+    arrays = build_index(read_word_list(path), measure_text, max_width)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for name, array in zip(names, arrays):
+            np.save(os.path.join(cache_dir, f"{name}.npy"), array)
+        with open(os.path.join(cache_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+    except OSError:
+        # A read-only location only costs us the cache
+        pass
+    return WordDictionary(*arrays)
@@ -0,0 +1,89 @@
+import pygame
+
+# Dirty-rectangle renderer for the gameplay screen
+#
+# Drawing goes through blit()/blits() like a normal surface, but nothing is
+# drawn until present(). Each blit is remembered by (surface, rect); a blit
+# that was also made last frame with the same surface at the same place is
+# unchanged and costs nothing. Everything else marks its previous and
+# current rect dirty. Each dirty rect is cleared to the background and all
+# blits touching it are repainted in their original order, then only those
+# rects are pushed with pygame.display.update. When the dirty area covers
+# more than `threshold` of the screen, the whole frame is redrawn and
+# flipped instead.
+class DirtyRectRenderer:
+    def __init__(self, screen, background, threshold=0.5):
+        self.screen = screen
+        self.background = background
+        self.threshold = threshold
+        self.frames = 0
+        self.full_redraws = 0
+        self.last_dirty_area = 0
+        self._previous = {}
+        self._draws = []
+        self._full = True
+
+    # Force the next present() to repaint the whole screen, e.g. after
+    # another screen has drawn over it.
+    def invalidate(self):
+        self._full = True
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = pygame.Rect(dest[0], dest[1], 0, 0)
+        if area is None:
+            rect.size = source.get_size()
+        else:
+            rect.size = pygame.Rect(area).size
+        self._draws.append((source, rect, area, special_flags))
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        rects = [self.blit(*item) for item in blit_sequence]
+        return rects if doreturn else None
+
+    def present(self):
+        draws = self._draws
+        self._draws = []
+        current = {}
+        for source, rect, _, _ in draws:
+            current[(id(source), rect.x, rect.y, rect.w, rect.h)] = (source, rect)
+        previous = self._previous
+        self._previous = current
+        self.frames += 1
+
+        dirty = []
+        if not self._full:
+            for key, (_, rect) in previous.items():
+                if key not in current:
+                    dirty.append(rect)
+            for key, (_, rect) in current.items():
+                if key not in previous:
+                    dirty.append(rect)
+            screen_rect = self.screen.get_rect()
+            dirty = [r.clip(screen_rect) for r in dirty]
+            dirty = [r for r in dirty if r.w and r.h]
+            self.last_dirty_area = sum(r.w * r.h for r in dirty)
+            if self.last_dirty_area > self.threshold * screen_rect.w * screen_rect.h:
+                self._full = True
+
+        if self._full:
+            self._full = False
+            self.full_redraws += 1
+            self.last_dirty_area = self.screen.get_width() * self.screen.get_height()
+            self.screen.fill(self.background)
+            for source, rect, area, flags in draws:
+                self.screen.blit(source, rect, area, flags)
+            pygame.display.flip()
+            return None
+
+        rects = [rect for _, rect, _, _ in draws]
+        for dirty_rect in dirty:
+            self.screen.set_clip(dirty_rect)
+            self.screen.fill(self.background, dirty_rect)
+            for i in dirty_rect.collidelistall(rects):
+                source, rect, area, flags = draws[i]
+                self.screen.blit(source, rect, area, flags)
+        self.screen.set_clip(None)
+        if dirty:
+            pygame.display.update(dirty)
+        return dirty
@@ -0,0 +1,277 @@
+import random
+
+import numpy as np
+
+from colors import MINT, SKY_BLUE, CORAL
+from particles import ParticlePool
+from word_index import PrefixCursor
+from word_store import WordStore
+
+# Game rules without pygame
+#
+# GameState owns everything that decides how a game plays out: spawning,
+# falling, matching, scoring, combos, difficulty and game over. It never
+# touches a display, so it can be driven by the pygame front end, by tests
+# and tools, or headless as fast as step() can be called.
+
+# Built-in word pool, used when no external dictionary is loaded (see
+# dictionary.py)
+WORD_POOL = [
+    "cat", "dog", "run", "sun", "code", "game", "type", "word", "key", "fun",
+    "box", "zoo", "car", "map", "cup", "hat", "pen", "jam", "fox", "log",
+    "python", "typing", "shooter", "keyboard", "display", "program", "develop",
+    "rocket", "basket", "garden", "window", "monitor", "laptop", "digital",
+    "algorithm", "mechanics", "challenge", "adventure", "programming",
+    "beautiful", "dangerous", "happiness", "knowledge", "mountain", "quickly"
+]
+
+# Fall speeds in pixels per second: a base speed that grows with the
+# level, plus a bonus per level and per letter of the word
+BASE_SPEED = 30.0
+LEVEL_SPEED = 1.2
+LETTER_SPEED = 1.2
+
+
+# How the game gets harder over time
+#
+# Level 1 lasts `warmup` seconds, then the level goes up by one every
+# `level_time` seconds until `max_level`. Words spawn every
+# `spawn_interval` seconds, less `spawn_per_level` per level but never
+# faster than `min_spawn_interval`. A word falls at the base speed plus
+# `level_speed` per level and `letter_speed` per letter, and after the
+# warm-up the base speed itself grows by `level_speed` per level.
+class DifficultyCurve:
+    def __init__(self, warmup=30.0, level_time=15.0, max_level=20,
+                 spawn_interval=2.0, spawn_per_level=0.05, min_spawn_interval=0.5,
+                 base_speed=BASE_SPEED, level_speed=LEVEL_SPEED, letter_speed=LETTER_SPEED):
+        self.warmup = warmup
+        self.level_time = level_time
+        self.max_level = max_level
+        self.spawn_interval = spawn_interval
+        self.spawn_per_level = spawn_per_level
+        self.min_spawn_interval = min_spawn_interval
+        self.base_speed = base_speed
+        self.level_speed = level_speed
+        self.letter_speed = letter_speed
+
+    # (level, base speed) after `elapsed` seconds of play
+    def level_at(self, elapsed):
+        if elapsed < self.warmup:
+            return 1, self.base_speed
+        level = min(self.max_level, 1 + int((elapsed - self.warmup) / self.level_time))
+        return level, self.base_speed + (level * self.level_speed)
+
+    def spawn_delay(self, level):
+        return max(self.min_spawn_interval, self.spawn_interval - (level * self.spawn_per_level))
+
+    def fall_speed(self, base_speed, level, length):
+        return base_speed + (level * self.level_speed) + (length * self.letter_speed)
+
+    # Parameters as a dict, and a curve from one with any subset of them
+    def to_dict(self):
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, params):
+        return cls(**params)
+
+
+DEFAULT_CURVE = DifficultyCurve()
+
+# Special input characters; anything else is typed into the input
+BACKSPACE = "\b"
+SUBMIT = "\r"
+
+# Event kinds returned by step()
+HIT = "hit"
+MISS = "miss"
+SPAWN = "spawn"
+GAME_OVER = "game_over"
+
+
+# Rough width of a word in the default 36px font, for runs without pygame
+def estimate_text_width(text):
+    return len(text) * 16
+
+
+class GameState:
+    def __init__(self, width=800, height=600, measure_text=estimate_text_width,
+                 make_sprite=None, seed=None, stress_words=0, word_pool=WORD_POOL,
+                 word_source=None, dictionary=None, profiler=None, curve=DEFAULT_CURVE):
+        self.width = width
+        self.height = height
+        # Text -> width in pixels, used to keep spawned words on screen
+        self.measure_text = measure_text
+        # Optional (text, color) -> sprite hook, so the renderer can attach
+        # a pre-rendered surface to each word when it spawns
+        self.make_sprite = make_sprite
+        # Stress mode keeps this many words on screen and recycles words
+        # that reach the bottom instead of ending the game
+        self.stress_words = stress_words
+        self.word_pool = word_pool
+        # Optional WordDictionary; when set, words are sampled from it for
+        # the current level instead of picked uniformly from word_pool
+        self.dictionary = dictionary
+        self.curve = curve
+        # Optional FrameProfiler (profiler.py) that each part of step() is
+        # timed against
+        self.profiler = profiler
+        # Optional state -> (text, width, x) hook that decides each spawned
+        # word instead of the RNG, used to replay recorded sessions
+        self.word_source = word_source
+        # Each game is seeded on reset; without an explicit seed the next
+        # one is drawn from here, so a seeded GameState is reproducible
+        # across games and an unseeded one is random
+        self.seeds = random.Random(seed)
+        self.words = WordStore(bottom=height)
+        self.cursor = PrefixCursor(self.words.index)
+        self.particles = ParticlePool(capacity=4096)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.seed = seed if seed is not None else self.seeds.getrandbits(32)
+        self.rng = random.Random(self.seed)
+        self.particles.rng = np.random.default_rng(self.seed)
+        self.ticks = 0
+        self.words.clear()
+        self.particles.clear()
+        self.cursor.reset()
+        self.input = ""
+        self.score = 0
+        self.words_typed = 0
+        self.combo = 0
+        self.max_combo = 0
+        self.level = 1
+        self.base_speed = self.curve.base_speed
+        self.word_count = 0
+        self.elapsed = 0.0
+        self.last_word_spawn = float('-inf')
+        self.game_over = False
+
+    # Advance the game by `dt` seconds after applying `inputs`, a string or
+    # sequence of typed characters (BACKSPACE and SUBMIT included). Returns
+    # the list of (kind, data) events that happened during the step.
+    # Everything moves in units per second, so the outcome depends only on
+    # the total time stepped; the front end steps at a fixed rate.
+    def step(self, dt, inputs=()):
+        events = []
+        if self.game_over:
+            return events
+        profiler = self.profiler
+        for ch in inputs:
+            self.handle_input(ch, events)
+        self.elapsed += dt
+        if profiler is not None:
+            profiler.lap("input")
+        self.update_difficulty()
+        if profiler is not None:
+            profiler.lap("difficulty")
+        word_id = self.spawn_word()
+        if word_id is not None:
+            events.append((SPAWN, self.words.get(word_id)))
+        if profiler is not None:
+            profiler.lap("spawn")
+        self.words.advance(dt)
+
+        fallen = self.words.fallen()
+        while fallen is not None and self.stress_words:
+            self.words.remove(fallen)
+            fallen = self.words.fallen()
+        if fallen is not None:
+            word = self.words.get(fallen)
+            self.words.remove(fallen)
+            self.game_over = True
+            events.append((GAME_OVER, word))
+        if profiler is not None:
+            profiler.lap("falling")
+
+        self.particles.update(dt, bounds=(self.width, self.height))
+        if profiler is not None:
+            profiler.lap("particles")
+        self.ticks += 1
+        return events
+
+    def handle_input(self, ch, events):
+        if ch == SUBMIT:
+            self.submit(events)
+        elif ch == BACKSPACE:
+            self.input = self.input[:-1]
+            self.cursor.pop()
+        else:
+            ch = ch.lower()
+            self.input += ch
+            self.cursor.push(ch)
+
+    # One submit clears every word showing the typed text, oldest first,
+    # each scored and counted towards the combo on its own
+    def submit(self, events):
+        text = self.input
+        self.input = ""
+        self.cursor.reset()
+        word_ids = sorted(self.words.find(text))
+        if not word_ids:
+            self.combo = 0
+            if text:
+                events.append((MISS, text))
+            return
+
+        for word_id in word_ids:
+            word = self.words.get(word_id)
+            self.words.remove(word_id)
+            points = 10 + (len(word.text) * 2)
+            self.words_typed += 1
+            self.combo += 1
+            if self.combo > self.max_combo:
+                self.max_combo = self.combo
+            if self.combo >= 3:
+                points += self.combo * 5
+            self.score += points
+            self.create_explosion(word.x + word.width//2, word.y + 10, word.color)
+            events.append((HIT, word))
+
+    # Ids of the words that start with the typed text, for highlighting
+    def typed_targets(self):
+        return self.cursor.targets() if self.input else ()
+
+    def update_difficulty(self):
+        self.level, self.base_speed = self.curve.level_at(self.elapsed)
+
+    def spawn_word(self):
+        if self.stress_words:
+            if len(self.words) >= self.stress_words:
+                return
+        elif self.elapsed - self.last_word_spawn < self.curve.spawn_delay(self.level):
+            return
+
+        if self.word_source is not None:
+            word, word_width, x = self.word_source(self)
+        else:
+            word, word_width, x = self.choose_word()
+        y = 0
+
+        if len(word) < 5:
+            color = MINT
+        elif len(word) < 8:
+            color = SKY_BLUE
+        else:
+            color = CORAL
+
+        speed = self.curve.fall_speed(self.base_speed, self.level, len(word))
+        sprite = self.make_sprite(word, color) if self.make_sprite else None
+        word_id = self.words.add(word, x, y, speed, color, word_width, sprite)
+        self.word_count += 1
+        self.last_word_spawn = self.elapsed
+        return word_id
+
+    # Pick the next word and where it appears
+    def choose_word(self):
+        if self.dictionary is not None:
+            word, word_width = self.dictionary.sample(self.level, self.rng)
+        else:
+            word = self.rng.choice(self.word_pool)
+            word_width = self.measure_text(word)
+        x = self.rng.randint(50, self.width - word_width - 50)
+        return word, word_width, x
+
+    def create_explosion(self, x, y, color):
+        self.particles.emit(x, y, color, 15)
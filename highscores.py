@@ -0,0 +1,41 @@
+import json
+import math
+import os
+import sys
+
+# The single-record high score file of older versions; history.py imports
+# it into the session database once
+HIGHSCORES_FILE = "highscores.json"
+
+
+def default_high_scores():
+    return {"score": 0, "words": 0, "least_time": float('inf')}
+
+
+# Load high scores from file
+#
+# A missing file gives the defaults. A file that cannot be parsed is moved
+# aside to <file>.corrupt so the next save does not silently destroy it,
+# and fields with the wrong type fall back to their defaults one by one.
+def load_high_scores(path=HIGHSCORES_FILE):
+    scores = default_high_scores()
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return scores
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable high score file {path}: {e}", file=sys.stderr)
+        try:
+            os.replace(path, path + ".corrupt")
+        except OSError:
+            pass
+        return scores
+
+    if not isinstance(data, dict):
+        return scores
+    for key, default in scores.items():
+        value = data.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value):
+            scores[key] = type(default)(value)
+    return scores
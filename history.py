@@ -0,0 +1,341 @@
+import argparse
+import getpass
+import math
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+from highscores import HIGHSCORES_FILE, default_high_scores, load_high_scores
+
+# Session history in SQLite
+#
+# Every finished game is one row in `sessions`. The database runs in WAL
+# mode, so the game can keep writing while a leaderboard or another tool
+# reads, and the indexes keep the queries the game needs (records, top
+# scores, one player's recent games) fast however many sessions there are.
+#
+# A database created next to an old highscores.json imports its three
+# records once, as a single session for the player "legacy".
+
+SESSIONS_DB = "sessions.db"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    score INTEGER NOT NULL,
+    words INTEGER NOT NULL,
+    max_combo INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    first_word REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (score DESC);
+CREATE INDEX IF NOT EXISTS sessions_by_words ON sessions (words);
+CREATE INDEX IF NOT EXISTS sessions_by_first_word ON sessions (first_word);
+CREATE INDEX IF NOT EXISTS sessions_by_player ON sessions (player, started_at DESC);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Where a session was played, so histories from several machines can be
+# merged and still told apart
+MACHINE = socket.gethostname()
+
+COLUMNS = ("player", "machine", "started_at", "duration", "score", "words", "max_combo", "level", "first_word")
+
+
+# WORD_SHUTTER_PLAYER, else the login name. getuser() fails for a uid
+# with no passwd entry, as in many containers, so there is a fallback.
+def default_player():
+    name = os.environ.get("WORD_SHUTTER_PLAYER")
+    if name:
+        return name
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):
+        return "player"
+
+
+# One session as a row for SessionStore.add(). `first_word` is how many
+# seconds into the game the first word was typed (None if none was),
+# which is what the "Best Time" record tracks.
+def session_row(player, started_at, duration, score, words, max_combo, level, first_word=None):
+    return {"player": player, "machine": MACHINE, "started_at": started_at,
+            "duration": duration, "score": score, "words": words, "max_combo": max_combo,
+            "level": level, "first_word": first_word}
+
+
+class SessionStore:
+    def __init__(self, path=SESSIONS_DB, legacy_path=HIGHSCORES_FILE):
+        self.path = path
+        # Autocommit; transactions are opened explicitly where needed
+        self.db = sqlite3.connect(path, timeout=10.0, isolation_level=None)
+        try:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode NORMAL never corrupts the database; a power cut can
+            # only lose the last few transactions
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+            self._migrate(legacy_path)
+        except BaseException:
+            self.db.close()
+            raise
+
+    def _migrate(self, legacy_path):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            done = self.db.execute("SELECT value FROM meta WHERE key = 'legacy_import'").fetchone()
+            if done is None:
+                if legacy_path and os.path.exists(legacy_path):
+                    scores = load_high_scores(legacy_path)
+                    first_word = scores["least_time"] if math.isfinite(scores["least_time"]) else None
+                    if scores["score"] or scores["words"] or first_word is not None:
+                        self._insert([session_row("legacy", os.path.getmtime(legacy_path), 0.0,
+                                                  scores["score"], scores["words"], 0, 0, first_word)])
+                self.db.execute("INSERT INTO meta VALUES ('legacy_import', ?)", (legacy_path or "",))
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def _insert(self, rows):
+        self.db.executemany(
+            f"INSERT INTO sessions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [tuple(row[column] for column in COLUMNS) for row in rows])
+
+    # Insert many sessions in one transaction
+    def add(self, rows):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(rows)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    # The records shown in the game, in the shape load_high_scores() returns.
+    # Each is its own query so SQLite answers it from an index.
+    def records(self):
+        score = self.db.execute("SELECT MAX(score) FROM sessions").fetchone()[0]
+        words = self.db.execute("SELECT MAX(words) FROM sessions").fetchone()[0]
+        first_word = self.db.execute("SELECT MIN(first_word) FROM sessions").fetchone()[0]
+        return {"score": score or 0, "words": words or 0,
+                "least_time": first_word if first_word is not None else float('inf')}
+
+    # The `k` best sessions, best first
+    def top(self, k=10):
+        return self._rows("SELECT * FROM sessions ORDER BY score DESC LIMIT ?", (k,))
+
+    # A player's most recent sessions, newest first
+    def history(self, player, limit=50):
+        return self._rows("SELECT * FROM sessions WHERE player = ? ORDER BY started_at DESC LIMIT ?",
+                          (player, limit))
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _rows(self, query, params):
+        cursor = self.db.execute(query, params)
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def close(self):
+        self.db.close()
+
+
+# Background writer for finished sessions
+#
+# submit() queues a session and returns. A daemon thread with its own
+# connection inserts everything queued at most once every `interval`
+# seconds, in one transaction; flush() asks for the queue to be written
+# right away and close() writes it and stops the thread.
+class SessionWriter:
+    def __init__(self, path=SESSIONS_DB, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self.writes = 0
+        self.errors = 0
+        self._pending = []
+        self._flush_now = False
+        self._writing = False
+        self._closing = False
+        self._last_write = float('-inf')
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        with self._cond:
+            self._pending.append(row)
+            self._cond.notify()
+
+    def flush(self, wait=False):
+        with self._cond:
+            if not self._pending and not self._writing:
+                return
+            self._flush_now = bool(self._pending)
+            self._cond.notify()
+            if wait:
+                while self._flush_now or self._writing:
+                    self._cond.wait()
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        store = None
+        while True:
+            with self._cond:
+                while True:
+                    if not self._pending:
+                        if self._closing:
+                            if store is not None:
+                                store.close()
+                            return
+                        self._cond.wait()
+                        continue
+                    if self._flush_now or self._closing:
+                        break
+                    delay = self._last_write + self.interval - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                rows = self._pending
+                self._pending = []
+                self._flush_now = False
+                self._writing = True
+
+            try:
+                if store is None:
+                    store = SessionStore(self.path)
+                store.add(rows)
+                ok = True
+            except sqlite3.Error as e:
+                print(f"Could not save sessions to {self.path}: {e}", file=sys.stderr)
+                ok = False
+
+            with self._cond:
+                self._writing = False
+                self._last_write = time.monotonic()
+                if ok:
+                    self.writes += 1
+                else:
+                    self.errors += 1
+                    # Keep them for the next attempt, ahead of newer ones
+                    if not self._closing:
+                        self._pending[:0] = rows
+                self._cond.notify_all()
+
+
+def _read_records(path):
+    store = SessionStore(path)
+    try:
+        return store.records()
+    finally:
+        store.close()
+
+
+# The records in the database at `path`. A database that cannot be read
+# is moved aside to <path>.corrupt, like an unreadable high score file,
+# and a fresh one is started in its place; if even that fails the game
+# starts from no records.
+def load_records(path=SESSIONS_DB):
+    try:
+        return _read_records(path)
+    except sqlite3.DatabaseError as e:
+        print(f"Ignoring unreadable session database {path}: {e}", file=sys.stderr)
+        # The WAL files belong to the old database
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.replace(path + suffix, path + ".corrupt" + suffix)
+            except OSError:
+                pass
+    try:
+        return _read_records(path)
+    except sqlite3.DatabaseError as e:
+        print(f"Could not start a new session database {path}: {e}", file=sys.stderr)
+        return default_high_scores()
+
+
+# Records and session bookkeeping for a front end
+#
+# Starts from the records in the database and a background SessionWriter,
+# then follows the games played: start() when one begins, word_typed()
+# for every word typed, with the game time it happened at, and finish()
+# when it ends or is abandoned, which saves it and folds it into the
+# records. Best Time is the quickest first word, as stored in the rows.
+class SessionTracker:
+    def __init__(self, path=SESSIONS_DB, player=None, interval=5.0):
+        records = load_records(path)
+        self.high_score = records["score"]
+        self.highest_words = records["words"]
+        self.least_time = records["least_time"]
+        self.player = player or default_player()
+        self.writer = SessionWriter(path, interval=interval)
+        self.started = None
+        self.first_word = None
+
+    def start(self):
+        self.started = time.time()
+        self.first_word = None
+
+    def word_typed(self, state, elapsed):
+        if self.first_word is None:
+            self.first_word = elapsed
+        self.update_records(state)
+
+    def update_records(self, state):
+        self.high_score = max(self.high_score, state.score)
+        self.highest_words = max(self.highest_words, state.words_typed)
+        if self.first_word is not None:
+            self.least_time = min(self.least_time, self.first_word)
+
+    # Save the game in progress, if any, and return its row
+    def finish(self, state):
+        if self.started is None:
+            return None
+        self.update_records(state)
+        row = session_row(self.player, self.started, state.elapsed, state.score, state.words_typed,
+                          state.max_combo, state.level, self.first_word)
+        self.writer.submit(row)
+        self.writer.flush()
+        self.started = None
+        return row
+
+    def close(self):
+        self.writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the Word Shutter session history.")
+    parser.add_argument("--db", default=SESSIONS_DB, help="session database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    top = commands.add_parser("top", help="best sessions")
+    top.add_argument("k", type=int, nargs="?", default=10)
+    player = commands.add_parser("player", help="a player's recent sessions")
+    player.add_argument("name")
+    player.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    store = SessionStore(args.db)
+    rows = store.top(args.k) if args.command == "top" else store.history(args.name, args.limit)
+    for row in rows:
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["started_at"]))
+        print(f"{row['score']:>8}  {row['words']:>4} words  combo {row['max_combo']:>3}  "
+              f"level {row['level']:>2}  {row['duration']:7.1f}s  {started}  {row['player']}@{row['machine']}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import pygame
+
+# Surface that is only rebuilt when the state it depends on changes
+#
+# `build` is called with the key values and must return a surface. Static
+# screens pass no key and are built exactly once; screens that show a few
+# values (high scores, final stats) pass them as the key.
+class Layer:
+    def __init__(self, build):
+        self.build = build
+        self.key = None
+        self.surface = None
+        self.builds = 0
+
+    def get(self, *key):
+        if self.surface is None or key != self.key:
+            self.surface = self.build(*key)
+            self.key = key
+            self.builds += 1
+        return self.surface
+
+    def draw(self, target, pos, *key):
+        return target.blit(self.get(*key), pos)
+
+    def invalidate(self):
+        self.surface = None
+        self.key = None
+
+
+# Rounded HUD panel with one line of shadowed text
+#
+# The panel is re-rendered only when its text or colour changes. `anchor`
+# is "left", "right" or "center" and decides which edge of the panel sits
+# at `x`. A fixed `width` keeps the panel size constant (input box);
+# otherwise it grows with the text.
+class HudWidget:
+    def __init__(self, text_cache, font, x, y, anchor="left", width=None, height=30,
+                 background=(30, 40, 50), border=None, shadow=(13, 19, 33),
+                 padding=(10, 5)):
+        self.text_cache = text_cache
+        self.font = font
+        self.x = x
+        self.y = y
+        self.anchor = anchor
+        self.width = width
+        self.height = height
+        self.background = background
+        self.border = border
+        self.shadow = shadow
+        self.padding = padding
+        self._layer = Layer(self._build)
+
+    def _build(self, text, color):
+        text_surf = self.text_cache.render_shadow(text, self.font, color, self.shadow)
+        if self.width is not None:
+            width = self.width
+        else:
+            width = text_surf.get_width() - 2 + self.padding[0] * 2
+        surface = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        pygame.draw.rect(surface, self.background, surface.get_rect(), border_radius=5)
+        if self.border is not None:
+            pygame.draw.rect(surface, self.border, surface.get_rect(), 2, border_radius=5)
+        surface.blit(text_surf, self.padding)
+        return surface
+
+    def draw(self, target, text, color):
+        surface = self._layer.get(text, color)
+        if self.anchor == "right":
+            x = self.x - surface.get_width()
+        elif self.anchor == "center":
+            x = self.x - surface.get_width() // 2
+        else:
+            x = self.x
+        return target.blit(surface, (x, self.y))
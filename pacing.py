@@ -0,0 +1,64 @@
+import time
+
+# Fixed-timestep loop with render interpolation
+#
+# The game is always stepped in slices of exactly `step` seconds. Real
+# frame time is added to an accumulator and as many whole steps as fit are
+# run; the leftover fraction is `alpha`, used to draw moving things between
+# their last two simulated positions. A frame longer than `max_frame` only
+# counts as `max_frame`, so a long stall slows the game down briefly
+# instead of making it run hundreds of catch-up steps.
+class FixedTimestep:
+    def __init__(self, rate=60, max_frame=0.25):
+        self.step = 1.0 / rate
+        self.max_frame = max_frame
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+    # Number of steps to run for a frame that took `frame_time` seconds
+    def advance(self, frame_time):
+        self.accumulator += min(frame_time, self.max_frame)
+        steps = int(self.accumulator / self.step)
+        self.accumulator -= steps * self.step
+        self.alpha = self.accumulator / self.step
+        return steps
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.alpha = 0.0
+
+
+# How the front end paces frames
+#
+# "capped"    sleep so frames run at no more than `fps`
+# "vsync"     let the display's vertical sync pace the frames
+# "uncapped"  run as fast as possible, for benchmarking
+PACING_MODES = ("capped", "vsync", "uncapped")
+
+
+class FramePacer:
+    def __init__(self, clock, mode="capped", fps=60):
+        if mode not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode {mode!r}, expected one of {PACING_MODES}")
+        self.clock = clock
+        self.mode = mode
+        self.fps = fps
+        self._last = time.perf_counter()
+
+    # Keyword arguments for pygame.display.set_mode; vsync needs a
+    # renderer-backed window, which pygame only provides with SCALED
+    def display_options(self, scaled_flag):
+        if self.mode == "vsync":
+            return {"flags": scaled_flag, "vsync": 1}
+        return {}
+
+    # End the frame and return the real time since the previous one
+    def tick(self):
+        if self.mode == "capped":
+            self.clock.tick(self.fps)
+        else:
+            self.clock.tick()
+        now = time.perf_counter()
+        frame_time = now - self._last
+        self._last = now
+        return frame_time
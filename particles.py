@@ -0,0 +1,111 @@
+import numpy as np
+
+# Fixed-capacity particle pool for explosions
+#
+# Particles are stored as parallel NumPy arrays and the live ones are kept
+# packed at the front, so updating and culling are a handful of vectorized
+# operations no matter how many particles are alive. Colours are stored as
+# an index into `palette` so the renderer can look up pre-made sprites.
+# Velocities are in pixels per second and life in seconds; the previous
+# position is kept so drawing can interpolate between two updates.
+class ParticlePool:
+    def __init__(self, capacity=4096, rng=None):
+        self.capacity = capacity
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.prev_x = np.zeros(capacity, dtype=np.float32)
+        self.prev_y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.palette = []
+        self.count = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.count
+
+    def color_index(self, color):
+        color = tuple(color)
+        try:
+            return self.palette.index(color)
+        except ValueError:
+            if len(self.palette) >= 256:
+                raise ValueError("particle palette is full")
+            self.palette.append(color)
+            return len(self.palette) - 1
+
+    # Emit a burst of `n` particles around (x, y). Particles that do not fit
+    # in the pool are dropped and counted in `dropped`.
+    def emit(self, x, y, color, n=15):
+        start = self.count
+        end = min(self.capacity, start + n)
+        self.dropped += n - (end - start)
+        n = end - start
+        if n <= 0:
+            return
+        rng = self.rng
+        self.x[start:end] = x + rng.integers(-20, 21, n)
+        self.y[start:end] = y + rng.integers(-20, 21, n)
+        self.prev_x[start:end] = self.x[start:end]
+        self.prev_y[start:end] = self.y[start:end]
+        self.vx[start:end] = rng.uniform(-180, 180, n)
+        self.vy[start:end] = rng.uniform(-480, -120, n)
+        self.life[start:end] = rng.integers(20, 41, n) / 60
+        self.color[start:end] = self.color_index(color)
+        self.count = end
+
+    # Advance every live particle by `dt` seconds and drop the dead ones.
+    # With `bounds` (width, height), particles that left the screen are
+    # dropped as well.
+    def update(self, dt, bounds=None):
+        n = self.count
+        if n == 0:
+            return
+        x, y = self.x[:n], self.y[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        x += self.vx[:n] * dt
+        y += self.vy[:n] * dt
+        life = self.life[:n]
+        life -= dt
+        alive = life > 0
+        if bounds is not None:
+            alive &= (x > -10) & (y > -10) & (x < bounds[0]) & (y < bounds[1])
+        if alive.all():
+            return
+        keep = np.flatnonzero(alive)
+        m = len(keep)
+        for array in (self.x, self.y, self.prev_x, self.prev_y, self.vx, self.vy, self.life, self.color):
+            array[:m] = array[keep]
+        self.count = m
+
+    def clear(self):
+        self.count = 0
+
+    # A pool holding just a copy of the live particles, for drawing them
+    # on another thread while this one keeps updating
+    def copy(self):
+        n = self.count
+        pool = ParticlePool(capacity=max(1, n), rng=self.rng)
+        for name in ("x", "y", "prev_x", "prev_y", "vx", "vy", "life", "color"):
+            getattr(pool, name)[:n] = getattr(self, name)[:n]
+        pool.palette = list(self.palette)
+        pool.count = n
+        return pool
+
+    # Live particles as (x, y, colour index, life in 60 Hz frames) lists,
+    # ready for drawing. Positions are interpolated `alpha` of the way from
+    # the previous update to the latest one.
+    def live(self, alpha=1.0):
+        n = self.count
+        x = self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha
+        y = self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha
+        return (
+            x.astype(np.int32).tolist(),
+            y.astype(np.int32).tolist(),
+            self.color[:n].tolist(),
+            np.ceil(self.life[:n] * 60 - 1e-3).astype(np.int32).tolist(),
+        )
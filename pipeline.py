@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import deque
+
+from analytics import QuantileSketch
+from word_store import fill_sprites
+
+# Pipelined simulation
+#
+# In pipelined mode the game is stepped at a fixed rate on its own thread
+# instead of between drawing and display.flip() on the main thread. After
+# every step the simulation thread publishes an immutable GameSnapshot,
+# and the main thread draws whichever snapshot is the latest when it
+# starts a frame, so a slow frame no longer holds up the game's clock.
+# Little else runs in parallel: pygame (2.6) keeps the GIL while it blits
+# and renders text and only releases it in display.flip()/update(), so
+# the flip is the only part of a frame the simulation overlaps.
+#
+# The cost is latency: a key waits for the next step and then for the
+# next frame to draw that step's snapshot, so input takes about one step
+# longer to show than in sequential mode, where a frame steps and draws
+# straight after reading the keys.
+#
+# SDL wants its window and event queue handled by the thread that opened
+# them, so the main thread still reads the keyboard and draws; keys are
+# handed to the simulation thread as soon as they are read. Game events
+# (hits, misses, game over) are handed back and handled on the main
+# thread, in order, so audio, analytics and recording work as before.
+#
+# A snapshot can be drawn wherever the live GameState is: both have
+# input, score, level, combo, words_typed, elapsed, words.sprites(),
+# words.position(), particles.live() and typed_targets().
+#
+# Text surfaces must only be rendered on the main thread, so a pipelined
+# GameState spawns words without a sprite and words.sprites() is given a
+# make_sprite hook that renders the missing ones as they are drawn.
+
+
+# Word positions and sprites at one step
+class WordSnapshot:
+    __slots__ = ("ids", "x", "prev_y", "y", "text", "color", "surface", "_slots")
+
+    def __init__(self, words):
+        n = len(words)
+        self.ids = tuple(words.ids)
+        self.x = _frozen(words.x[:n])
+        self.prev_y = _frozen(words.prev_y[:n])
+        self.y = _frozen(words.y[:n])
+        self.text = tuple(words.text)
+        self.color = tuple(words.color)
+        self.surface = tuple(words.surface)
+        self._slots = {word_id: slot for slot, word_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def position(self, word_id, alpha=1.0):
+        slot = self._slots[word_id]
+        y = self.prev_y[slot] + (self.y[slot] - self.prev_y[slot]) * alpha
+        return float(self.x[slot]), float(y)
+
+    def sprites(self, alpha=1.0, make_sprite=None):
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        return list(zip(fill_sprites(self.surface, self.text, self.color, make_sprite),
+                        zip(self.x.tolist(), y.tolist())))
+
+
+def _frozen(array):
+    array = array.copy()
+    array.flags.writeable = False
+    return array
+
+
+# Everything the front end draws of the game after one step. `consumed` is
+# how many inputs the game had been given by then, and `published` the
+# perf_counter() time the step finished.
+class GameSnapshot:
+    __slots__ = ("tick", "elapsed", "input", "score", "level", "combo", "words_typed",
+                 "game_over", "words", "particles", "targets", "consumed", "published")
+
+    def __init__(self, state, consumed, published):
+        self.tick = state.ticks
+        self.elapsed = state.elapsed
+        self.input = state.input
+        self.score = state.score
+        self.level = state.level
+        self.combo = state.combo
+        self.words_typed = state.words_typed
+        self.game_over = state.game_over
+        self.words = WordSnapshot(state.words)
+        self.particles = state.particles.copy()
+        self.targets = tuple(state.typed_targets())
+        self.consumed = consumed
+        self.published = published
+
+    def typed_targets(self):
+        return self.targets
+
+
+# Steps a GameState at `rate` per second on a daemon thread
+#
+# push() queues inputs for the next step; events() returns the
+# (tick, inputs, events) of every step since the last call; latest is the
+# newest GameSnapshot. pause() returns once no step is running and none
+# will start until resume(). The thread stops by itself at game over.
+class SimulationThread:
+    def __init__(self, state, rate=60, max_lag=0.25):
+        self.state = state
+        self.step = 1.0 / rate
+        self.max_lag = max_lag
+        self.consumed = 0
+        self.latest = GameSnapshot(state, 0, time.perf_counter())
+        self._inputs = []
+        self._events = []
+        self._paused = False
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def push(self, inputs):
+        with self._lock:
+            self._inputs.extend(inputs)
+
+    def events(self):
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+    def pause(self):
+        with self._lock:
+            self._paused = True
+
+    def resume(self):
+        with self._lock:
+            self._paused = False
+            self._wake.notify()
+
+    def stop(self):
+        with self._lock:
+            self._stopping = True
+            self._wake.notify()
+        self._thread.join()
+
+    def _run(self):
+        state = self.state
+        next_step = time.perf_counter() + self.step
+        while True:
+            delay = next_step - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                while self._paused and not self._stopping:
+                    self._wake.wait()
+                    # Do not catch up on the time spent paused
+                    next_step = time.perf_counter()
+                if self._stopping or state.game_over:
+                    return
+                inputs, self._inputs = self._inputs, []
+                tick = state.ticks
+                events = state.step(self.step, inputs)
+                self.consumed += len(inputs)
+                if inputs or events:
+                    self._events.append((tick, inputs, events))
+                self.latest = GameSnapshot(state, self.consumed, time.perf_counter())
+            next_step += self.step
+            # After a long stall, slow down instead of running catch-up steps
+            next_step = max(next_step, time.perf_counter() - self.max_lag)
+
+    # How far the latest snapshot should be drawn towards the next step,
+    # like FixedTimestep.alpha
+    def alpha(self, snapshot, now):
+        return min(1.0, max(0.0, (now - snapshot.published) / self.step))
+
+
+# Input-to-screen latency
+#
+# typed() is called with every game input as it is read from the
+# keyboard, and presented() after each display flip with how many inputs
+# the game state on screen had consumed. The latency of an input is the
+# time from reading it to the end of the first flip showing its effect.
+# Both calls are made on the main thread.
+class LatencyMeter:
+    def __init__(self):
+        self.sketch = QuantileSketch(low=0.0005, high=5.0)
+        self._read = deque()
+        self._shown = 0
+
+    def reset(self):
+        self._read.clear()
+        self._shown = 0
+
+    def typed(self, count, now):
+        self._read.extend([now] * count)
+
+    def presented(self, consumed, now):
+        while self._read and self._shown < consumed:
+            self.sketch.add(now - self._read.popleft())
+            self._shown += 1
+
+    def report(self, mode):
+        sketch = self.sketch
+        if not sketch.count:
+            return f"Input-to-screen latency ({mode}): no keys typed"
+        return (f"Input-to-screen latency ({mode}): p50 {sketch.quantile(0.5) * 1000:.1f} ms, "
+                f"p95 {sketch.quantile(0.95) * 1000:.1f} ms, p99 {sketch.quantile(0.99) * 1000:.1f} ms "
+                f"over {sketch.count} keys")
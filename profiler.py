@@ -0,0 +1,140 @@
+import json
+import time
+from collections import deque
+
+# Per-phase frame timing
+#
+# The main loop marks the end of each phase with lap(name); the time since
+# the previous lap is charged to that phase, so the phases of a frame add
+# up to the whole frame. A phase can be lapped several times per frame
+# (one simulation step after another) and its times are summed.
+#
+# Nothing is measured unless the profiler is enabled: begin_frame() latches
+# `enabled` for the whole frame, and lap()/end_frame() return right away
+# on an inactive frame, so a disabled profiler costs one attribute check
+# per call.
+class FrameProfiler:
+    def __init__(self, phases, history=600, trace=None):
+        self.phases = tuple(phases)
+        self.enabled = False
+        # Optional CsvTrace/ChromeTrace that every profiled frame is sent to
+        self.trace = trace
+        self.frames = 0
+        self.frame_times = deque(maxlen=history)
+        self.phase_history = {name: deque(maxlen=history) for name in self.phases}
+        self.counts = {}
+        self._active = False
+        self._start = self._last = 0.0
+        self._totals = dict.fromkeys(self.phases, 0.0)
+        self._laps = []
+
+    def begin_frame(self):
+        self._active = self.enabled
+        if not self._active:
+            return
+        self._start = self._last = time.perf_counter()
+        for name in self._totals:
+            self._totals[name] = 0.0
+        self._laps.clear()
+
+    def lap(self, name):
+        if not self._active:
+            return
+        now = time.perf_counter()
+        self._totals[name] += now - self._last
+        self._laps.append((name, self._last, now))
+        self._last = now
+
+    # Close the frame; `counts` are entity counts to show and export
+    def end_frame(self, **counts):
+        if not self._active:
+            return
+        self._active = False
+        now = time.perf_counter()
+        self.frames += 1
+        self.frame_times.append(now - self._start)
+        for name, total in self._totals.items():
+            self.phase_history[name].append(total)
+        self.counts = counts
+        if self.trace is not None:
+            self.trace.frame(self.frames, self._start, now, self._totals, self._laps, counts)
+
+    # Frame time in seconds at `fraction` (0.5 = median) of recent frames
+    def percentile(self, fraction):
+        if not self.frame_times:
+            return 0.0
+        ordered = sorted(self.frame_times)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def fps(self):
+        total = sum(self.frame_times)
+        return len(self.frame_times) / total if total > 0 else 0.0
+
+    # Mean seconds per frame of each phase over recent frames
+    def phase_means(self):
+        return {name: sum(times) / len(times)
+                for name, times in self.phase_history.items() if times}
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+
+# Per-frame timings as CSV: one row per frame with the frame's start and
+# length, every phase's total and the entity counts, all times in ms
+class CsvTrace:
+    def __init__(self, path, phases, counters=()):
+        self.phases = tuple(phases)
+        self.counters = tuple(counters)
+        self._origin = time.perf_counter()
+        self._file = open(path, "w", newline="")
+        self._file.write(",".join(("frame", "start_ms", "frame_ms") + self.phases + self.counters) + "\n")
+
+    def frame(self, number, start, end, totals, laps, counts):
+        row = [str(number), f"{(start - self._origin) * 1000:.3f}", f"{(end - start) * 1000:.3f}"]
+        row += [f"{totals[name] * 1000:.3f}" for name in self.phases]
+        row += [str(counts.get(name, "")) for name in self.counters]
+        self._file.write(",".join(row) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+# Per-frame timings in the Chrome trace event format, for chrome://tracing
+# or Perfetto: each frame and each lap is a complete ("X") event and the
+# entity counts are counter ("C") events. Events are streamed as they
+# happen; the viewers accept a file cut short by a crash.
+class ChromeTrace:
+    def __init__(self, path):
+        self._origin = time.perf_counter()
+        self._file = open(path, "w")
+        self._file.write("[\n")
+
+    def _us(self, t):
+        return round((t - self._origin) * 1e6, 1)
+
+    def _event(self, event):
+        self._file.write(json.dumps(event, separators=(",", ":")) + ",\n")
+
+    def frame(self, number, start, end, totals, laps, counts):
+        self._event({"name": "frame", "ph": "X", "pid": 1, "tid": 1, "ts": self._us(start),
+                     "dur": round((end - start) * 1e6, 1), "args": {"frame": number}})
+        for name, lap_start, lap_end in laps:
+            self._event({"name": name, "ph": "X", "pid": 1, "tid": 1, "ts": self._us(lap_start),
+                         "dur": round((lap_end - lap_start) * 1e6, 1)})
+        if counts:
+            self._event({"name": "entities", "ph": "C", "pid": 1, "tid": 1, "ts": self._us(start),
+                         "args": counts})
+
+    def close(self):
+        self._file.write("{}]\n")
+        self._file.close()
+
+
+# Trace writer for `path`, picked by extension: .json for Chrome traces,
+# anything else for CSV
+def open_trace(path, phases, counters=()):
+    if path.lower().endswith(".json"):
+        return ChromeTrace(path)
+    return CsvTrace(path, phases, counters)
@@ -0,0 +1,396 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from game_state import GameState, HIT, SPAWN, GAME_OVER, SUBMIT
+
+# Multiplayer races over TCP
+#
+# The server runs one GameState per player, all reset with the same seed.
+# Spawning only depends on the seed and the time played, so every player
+# gets the exact same stream of words, and everyone is scored by the same
+# rules as the single-player game; the race is won by the best score once
+# every player is out (or the time limit is up).
+#
+# Messages are single-line JSON objects in both directions. Clients send
+#   {"t": "join", "name": <name>}
+#   {"t": "keys", "k": <typed text, with "\b" and "\r" for BACKSPACE/ENTER>}
+# and the server sends
+#   {"t": "lobby", "id": <player id>, "players": {id: name}}
+#   {"t": "start", "seed", "sim", "tick", "w", "h", "players": {id: name}}
+#   {"t": "tick", "n": <sim tick>, ...}   only what changed, see below
+#   {"t": "end", "results": [[id, name, score, words], ...]}  best first
+#
+# Tick messages are deltas: "add" lists words spawned since the last
+# message as [id, text, x, speed, spawn tick], "del" the ids of words that
+# were typed or fell, "me" this player's [score, combo, level, words] when
+# it changed, and "board" the {id: [score, alive]} entries that changed.
+# A word's position is implied by its speed and spawn tick, so falling
+# words cost nothing to keep in sync. A message is sent every network tick
+# only if something changed, and at least once a second otherwise.
+
+DEFAULT_PORT = 7777
+
+# Per-client send buffer above which a client is considered stuck and is
+# disconnected rather than slowing down everyone else
+MAX_BUFFERED = 1 << 20
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class Player:
+    def __init__(self, player_id, name, writer):
+        self.id = player_id
+        self.name = name
+        self.writer = writer
+        self.state = None
+        self.pending = []
+        self.sent_me = None
+        self.last_sent = 0
+
+    def send(self, message):
+        self.writer.write(encode(message))
+
+
+class RaceServer:
+    def __init__(self, players=2, start_after=10.0, tick_rate=20, sim_rate=60,
+                 duration=None, width=800, height=600, seed=None):
+        if sim_rate % tick_rate:
+            raise ValueError("sim_rate must be a multiple of tick_rate")
+        self.min_players = players
+        self.start_after = start_after
+        self.tick_rate = tick_rate
+        self.sim_rate = sim_rate
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.seeds = random.Random(seed)
+        self.lobby = {}
+        self.racers = {}
+        self.races = 0
+        self._next_id = 1
+        self._first_join = None
+        self._joined = asyncio.Event()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Race server on {', '.join(str(s.getsockname()[:2]) for s in server.sockets)}")
+        async with server:
+            await self.run()
+
+    async def handle_client(self, reader, writer):
+        player = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    break
+                if not isinstance(message, dict):
+                    break
+                if player is None:
+                    if message.get("t") != "join":
+                        break
+                    player = self.join(str(message.get("name", ""))[:20], writer)
+                elif message.get("t") == "keys" and isinstance(message.get("k"), str):
+                    player.pending.append(message["k"][:64])
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if player is not None:
+                self.lobby.pop(player.id, None)
+                self.racers.pop(player.id, None)
+            writer.close()
+
+    def join(self, name, writer):
+        player = Player(self._next_id, name or f"player{self._next_id}", writer)
+        self._next_id += 1
+        self.lobby[player.id] = player
+        if self._first_join is None:
+            self._first_join = time.monotonic()
+        names = {p.id: p.name for p in self.lobby.values()}
+        for p in self.lobby.values():
+            p.send({"t": "lobby", "id": p.id, "players": names})
+        self._joined.set()
+        return player
+
+    # Run races back to back: each one starts once enough players are
+    # waiting, or `start_after` seconds after the first of them joined
+    async def run(self):
+        while True:
+            while not self.lobby:
+                self._first_join = None
+                self._joined.clear()
+                await self._joined.wait()
+            waited = time.monotonic() - self._first_join
+            if len(self.lobby) < self.min_players and waited < self.start_after:
+                self._joined.clear()
+                try:
+                    await asyncio.wait_for(self._joined.wait(), self.start_after - waited)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.race()
+
+    async def race(self):
+        self.racers, self.lobby = self.lobby, {}
+        self._first_join = None
+        self.races += 1
+        seed = self.seeds.getrandbits(32)
+        names = {p.id: p.name for p in self.racers.values()}
+        for player in self.racers.values():
+            player.state = GameState(self.width, self.height, seed=seed)
+            player.pending = []
+            player.sent_me = None
+            player.last_sent = 0
+            player.send({"t": "start", "seed": seed, "sim": self.sim_rate, "tick": self.tick_rate,
+                         "w": self.width, "h": self.height, "players": names})
+
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_rate
+        steps = self.sim_rate // self.tick_rate
+        dt = 1.0 / self.sim_rate
+        board = {}
+        next_tick = loop.time()
+        network_tick = 0
+        while self.racers:
+            # Sleep until the next tick on a fixed schedule, so slow ticks
+            # do not make the race drift
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            network_tick += 1
+
+            changed = {}
+            deltas = {}
+            for player in list(self.racers.values()):
+                state = player.state
+                added = []
+                removed = []
+                inputs = "".join(player.pending)
+                player.pending.clear()
+                for _ in range(steps):
+                    tick = state.ticks
+                    for kind, data in state.step(dt, inputs):
+                        if kind == SPAWN:
+                            added.append([data.id, data.text, int(data.x), round(data.speed, 3), tick])
+                        elif kind in (HIT, GAME_OVER):
+                            removed.append(data.id)
+                    inputs = ""
+                entry = [state.score, not state.game_over]
+                if board.get(player.id) != entry:
+                    board[player.id] = changed[player.id] = entry
+                deltas[player] = (added, removed)
+
+            for player, (added, removed) in deltas.items():
+                state = player.state
+                message = {"t": "tick", "n": state.ticks}
+                if added:
+                    message["add"] = added
+                if removed:
+                    message["del"] = removed
+                me = [state.score, state.combo, state.level, state.words_typed]
+                if me != player.sent_me:
+                    message["me"] = player.sent_me = me
+                if changed:
+                    message["board"] = changed
+                if len(message) > 2 or network_tick - player.last_sent >= self.tick_rate:
+                    self.send(player, message)
+                    player.last_sent = network_tick
+
+            elapsed = network_tick * interval
+            if all(p.state.game_over for p in self.racers.values()) or (
+                    self.duration is not None and elapsed >= self.duration):
+                break
+
+        results = sorted(self.racers.values(), key=lambda p: p.state.score, reverse=True)
+        message = {"t": "end", "results": [[p.id, p.name, p.state.score, p.state.words_typed] for p in results]}
+        for player in list(self.racers.values()):
+            self.send(player, message)
+            # Back to the lobby for the next race
+            self.lobby[player.id] = player
+        self.racers = {}
+        if self.lobby:
+            self._first_join = time.monotonic()
+
+    def send(self, player, message):
+        if player.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            player.writer.close()
+            self.racers.pop(player.id, None)
+            self.lobby.pop(player.id, None)
+            return
+        player.send(message)
+
+
+# Client side: mirrors the race from the server's messages
+#
+# `words` maps word ids to (text, x, speed, spawn tick); word_position()
+# turns that into a position at the latest known tick. Front ends and the
+# load test both build on this.
+class RaceClient:
+    def __init__(self, name):
+        self.name = name
+        self.id = None
+        self.players = {}
+        self.words = {}
+        self.board = {}
+        self.me = [0, 0, 1, 0]
+        self.tick = 0
+        self.sim_rate = 60
+        self.racing = False
+        self.results = None
+        self.messages = 0
+        self.bytes = 0
+        self._reader = self._writer = None
+
+    async def connect(self, host="127.0.0.1", port=DEFAULT_PORT):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._writer.write(encode({"t": "join", "name": self.name}))
+
+    def type(self, keys):
+        self._writer.write(encode({"t": "keys", "k": keys}))
+
+    def word_position(self, word_id):
+        text, x, speed, spawned = self.words[word_id]
+        return x, speed * (self.tick - spawned) / self.sim_rate
+
+    # Read messages until the connection closes, calling `on_message` (if
+    # given) after each one has been applied
+    async def run(self, on_message=None):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                self.messages += 1
+                self.bytes += len(line)
+                message = json.loads(line)
+                self.apply(message)
+                if on_message is not None:
+                    on_message(self, message)
+        finally:
+            self._writer.close()
+
+    def apply(self, message):
+        kind = message["t"]
+        if kind == "tick":
+            self.tick = message["n"]
+            for word_id, text, x, speed, spawned in message.get("add", ()):
+                self.words[word_id] = (text, x, speed, spawned)
+            for word_id in message.get("del", ()):
+                self.words.pop(word_id, None)
+            if "me" in message:
+                self.me = message["me"]
+            self.board.update(message.get("board", {}))
+        elif kind == "lobby":
+            self.id = message["id"]
+            self.players = message["players"]
+        elif kind == "start":
+            self.players = message["players"]
+            self.sim_rate = message["sim"]
+            self.words.clear()
+            self.board.clear()
+            self.tick = 0
+            self.racing = True
+            self.results = None
+        elif kind == "end":
+            self.racing = False
+            self.results = message["results"]
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+# Load test: `clients` simulated players join one race and each types the
+# lowest word on its screen at `wpm` words per minute (5 characters each)
+async def load_test(host, port, clients, wpm, races=1):
+    players = [RaceClient(f"bot{i}") for i in range(clients)]
+    for client in players:
+        await client.connect(host, port)
+    char_delay = 60.0 / (wpm * 5)
+    finals = []
+
+    async def bot(client):
+        races_left = [races]
+        finished = asyncio.Event()
+
+        def on_message(client, message):
+            if message["t"] == "end":
+                finals.extend(r for r in message["results"] if r[0] == client.id)
+                races_left[0] -= 1
+                if races_left[0] == 0:
+                    finished.set()
+
+        runner = asyncio.ensure_future(client.run(on_message))
+        try:
+            while not finished.is_set() and not runner.done():
+                if client.racing and client.words:
+                    lowest = max(client.words, key=lambda word_id: client.word_position(word_id)[1])
+                    for ch in client.words[lowest][0] + SUBMIT:
+                        client.type(ch)
+                        await asyncio.sleep(char_delay)
+                else:
+                    await asyncio.sleep(char_delay)
+        finally:
+            client.close()
+            runner.cancel()
+        return client
+
+    start = time.perf_counter()
+    done = await asyncio.gather(*(bot(client) for client in players))
+    elapsed = time.perf_counter() - start
+    total_bytes = sum(c.bytes for c in done)
+    total_messages = sum(c.messages for c in done)
+    print(f"{clients} clients, {elapsed:.1f}s: {total_messages} messages, {total_bytes / 1024:.0f} KiB "
+          f"({total_bytes / max(elapsed, 1e-9) / clients:.0f} bytes/s per client)")
+    if finals:
+        best = max(finals, key=lambda r: r[2])
+        print(f"{len(finals)} results, best score {best[2]} ({best[1]}), "
+              f"{sum(r[3] for r in finals)} words typed in total")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Word Shutter multiplayer races.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run a race server")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on, 0.0.0.0 for the LAN")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--players", type=int, default=2, help="players that start a race right away")
+    serve.add_argument("--start-after", type=float, default=10.0,
+                       help="seconds after the first join to start with fewer players")
+    serve.add_argument("--tick-rate", type=int, default=20, help="state updates sent per second")
+    serve.add_argument("--duration", type=float, default=None, help="time limit per race in seconds")
+
+    load = commands.add_parser("loadtest", help="simulate many players against a server")
+    load.add_argument("--host", default="127.0.0.1")
+    load.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load.add_argument("--clients", type=int, default=50)
+    load.add_argument("--wpm", type=float, default=40.0)
+    load.add_argument("--races", type=int, default=1)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "serve":
+            server = RaceServer(players=args.players, start_after=args.start_after,
+                                tick_rate=args.tick_rate, duration=args.duration)
+            asyncio.run(server.serve(args.host, args.port))
+        else:
+            asyncio.run(load_test(args.host, args.port, args.clients, args.wpm, args.races))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
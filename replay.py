@@ -0,0 +1,200 @@
+import argparse
+import os
+import struct
+import sys
+import time
+
+from game_state import GameState, SPAWN
+
+# Session recording and replay
+#
+# A recording is a small binary stream: a header with the RNG seed, step
+# rate and playfield size, then one record per tick that had something
+# happen. Typed input and spawned words are stored with the tick they
+# happened on, so feeding the same input into a GameState seeded the same
+# way at the same ticks plays the exact same game. Spawns are replayed
+# from the log rather than re-drawn, which keeps a replay valid when word
+# widths differ (headless has no fonts) or the word list has changed.
+# Pauses are stored with how long they lasted, and the replay viewer
+# pauses for as long at the same tick.
+#
+# Record layout, little-endian; every record starts with kind (u8) and
+# tick (u32):
+#   KEYS    u16 length, UTF-8 input (BACKSPACE/SUBMIT included)
+#   SPAWN   u16 x, u16 width, u8 length, UTF-8 word
+#   PAUSE   nothing
+#   RESUME  f32 seconds spent paused
+#   END     u32 score, u32 words typed
+
+MAGIC = b"WSR1"
+HEADER = struct.Struct("<4sIHHH")
+RECORD = struct.Struct("<BI")
+KEYS, SPAWN_RECORD, PAUSE, RESUME, END = range(1, 6)
+
+REPLAY_DIR = "replays"
+
+
+class SessionRecorder:
+    def __init__(self, path, seed, sim_rate, width, height):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, seed, sim_rate, width, height))
+
+    def _record(self, kind, tick, payload=b""):
+        self._file.write(RECORD.pack(kind, tick) + payload)
+
+    def keys(self, tick, inputs):
+        data = "".join(inputs).encode("utf-8")
+        self._record(KEYS, tick, struct.pack("<H", len(data)) + data)
+
+    def spawn(self, tick, word):
+        data = word.text.encode("utf-8")
+        self._record(SPAWN_RECORD, tick, struct.pack("<HHB", int(word.x), int(word.width), len(data)) + data)
+
+    def pause(self, tick):
+        self._record(PAUSE, tick)
+
+    def resume(self, tick, duration):
+        self._record(RESUME, tick, struct.pack("<f", duration))
+
+    # Record the inputs and events of one GameState step taken at `tick`
+    def step(self, tick, inputs, events):
+        if inputs:
+            self.keys(tick, inputs)
+        for kind, data in events:
+            if kind == SPAWN:
+                self.spawn(tick, data)
+
+    def close(self, state=None):
+        if self._file.closed:
+            return
+        if state is not None:
+            self._record(END, state.ticks, struct.pack("<II", state.score, state.words_typed))
+        self._file.close()
+
+
+def new_recording_path(directory=REPLAY_DIR):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"session-{stamp}-{os.getpid()}.wsr")
+
+
+# A recorded session, read fully into memory
+class Recording:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, self.seed, self.sim_rate, self.width, self.height = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a session recording")
+        self.path = path
+        self.inputs = {}
+        self.spawns = []
+        # Tick -> seconds the game was paused before that tick was stepped
+        self.pauses = {}
+        self.end = None
+        offset = HEADER.size
+        while offset < len(data):
+            kind, tick = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if kind == KEYS:
+                (length,) = struct.unpack_from("<H", data, offset)
+                offset += 2
+                self.inputs[tick] = self.inputs.get(tick, "") + data[offset:offset + length].decode("utf-8")
+                offset += length
+            elif kind == SPAWN_RECORD:
+                x, width, length = struct.unpack_from("<HHB", data, offset)
+                offset += 5
+                text = data[offset:offset + length].decode("utf-8")
+                offset += length
+                self.spawns.append((tick, text, width, x))
+            elif kind == PAUSE:
+                # The RESUME record says how long; a pause that never
+                # ended is the end of the session
+                pass
+            elif kind == RESUME:
+                (duration,) = struct.unpack_from("<f", data, offset)
+                offset += 4
+                self.pauses[tick] = self.pauses.get(tick, 0.0) + duration
+            elif kind == END:
+                self.end = (tick,) + struct.unpack_from("<II", data, offset)
+                offset += 8
+            else:
+                raise ValueError(f"{path}: unknown record kind {kind} at byte {offset - RECORD.size}")
+
+    # Number of steps the recorded session ran for
+    @property
+    def total_ticks(self):
+        if self.end is not None:
+            return self.end[0]
+        ticks = list(self.inputs) + [spawn[0] for spawn in self.spawns]
+        return max(ticks, default=-1) + 1
+
+    # GameState set up to replay this session. `diverged` on the returned
+    # source counts spawns that happened on a different tick than recorded.
+    def new_state(self, **kwargs):
+        source = RecordedWords(self.spawns)
+        state = GameState(self.width, self.height, word_source=source, **kwargs)
+        state.reset(self.seed)
+        return state, source
+
+
+# Word source that hands out the recorded spawns in order
+class RecordedWords:
+    def __init__(self, spawns):
+        self.spawns = spawns
+        self.position = 0
+        self.diverged = 0
+
+    def __call__(self, state):
+        if self.position >= len(self.spawns):
+            # Past the end of the recording: fall back to the RNG
+            self.diverged += 1
+            return state.choose_word()
+        tick, text, width, x = self.spawns[self.position]
+        self.position += 1
+        if tick != state.ticks:
+            self.diverged += 1
+        return text, width, x
+
+
+# Re-run a recording without a display as fast as possible
+def run_headless(recording):
+    state, source = recording.new_state()
+    dt = 1.0 / recording.sim_rate
+    total_ticks = recording.total_ticks
+    start = time.perf_counter()
+    while not state.game_over and state.ticks < total_ticks:
+        state.step(dt, recording.inputs.get(state.ticks, ""))
+    elapsed = time.perf_counter() - start
+    return state, source, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded Word Shutter session.")
+    parser.add_argument("recording", help="session file (.wsr)")
+    parser.add_argument("--headless", action="store_true",
+                        help="re-run without a display as fast as possible")
+    args = parser.parse_args(argv)
+
+    recording = Recording(args.recording)
+    if not args.headless:
+        import Game
+        Game.main(recording=recording)
+        return 0
+
+    state, source, elapsed = run_headless(recording)
+    print(f"{state.ticks} ticks in {elapsed:.3f}s ({state.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    print(f"score {state.score}, words {state.words_typed}, level {state.level}, game over: {state.game_over}")
+    if recording.end is not None:
+        end_tick, score, words = recording.end
+        matches = (score, words) == (state.score, state.words_typed) and source.diverged == 0
+        print(f"recorded score {score}, words {words}: {'match' if matches else 'MISMATCH'}")
+        return 0 if matches else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
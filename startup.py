@@ -0,0 +1,73 @@
+import sys
+import threading
+import time
+
+# Startup timing and background asset loading
+#
+# StartupTimer records named points since the process started loading the
+# game, from any thread, and prints them as a report. BackgroundLoader runs
+# slow setup work (audio, sounds, word lists) on a daemon thread while the
+# start screen is already showing; the front end picks up the results once
+# it needs them, waiting only if the loader is still busy at that point.
+
+
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.marks = []
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        elapsed = time.perf_counter() - self.start
+        with self._lock:
+            self.marks.append((name, elapsed, threading.current_thread().name))
+        return elapsed
+
+    def report(self, file=sys.stderr):
+        print("Startup timing (ms since launch):", file=file)
+        with self._lock:
+            marks = sorted(self.marks, key=lambda mark: mark[1])
+        for name, elapsed, thread in marks:
+            where = "" if thread == "MainThread" else f"  [{thread}]"
+            print(f"  {elapsed * 1000:8.1f}  {name}{where}", file=file)
+
+
+class BackgroundLoader:
+    def __init__(self, timer=None, name="asset-loader"):
+        self.timer = timer
+        self.name = name
+        self.results = {}
+        self.errors = {}
+        self._tasks = []
+        self._done = threading.Event()
+        self._thread = None
+
+    # Queue `load` to run in the background; its return value is stored in
+    # results[name], or the exception it raised in errors[name]
+    def add(self, name, load):
+        self._tasks.append((name, load))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    # Block until every task has finished; False if `timeout` ran out
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _run(self):
+        try:
+            for name, load in self._tasks:
+                try:
+                    self.results[name] = load()
+                except Exception as e:
+                    print(f"Could not load {name}: {e}", file=sys.stderr)
+                    self.errors[name] = e
+                if self.timer is not None:
+                    self.timer.mark(f"{name} loaded")
+        finally:
+            self._done.set()
@@ -0,0 +1,361 @@
+import argparse
+import curses
+import os
+import sys
+import time
+
+from colors import MINT, SKY_BLUE, CORAL
+from dictionary import load_dictionary
+from game_state import GameState, estimate_text_width, BACKSPACE, SUBMIT, HIT, GAME_OVER
+from history import SessionTracker, SESSIONS_DB
+from pacing import FixedTimestep
+
+# Terminal front end
+#
+# Plays the same GameState as the pygame window, in curses: the 800x600
+# playfield is scaled onto the terminal grid, one character per letter.
+# The game keeps its own pixel coordinates and estimated text widths, so
+# spawning, falling, matching, scoring and the difficulty curve are
+# exactly those of the headless game; only drawing differs.
+#
+# Each frame is drawn into an off-screen grid of cells and compared with
+# the grid already on the terminal, and only runs of changed cells are
+# written. A word falling one row costs a few dozen cells, a still frame
+# none, which keeps CPU and bandwidth low over SSH.
+
+WIDTH, HEIGHT = 800, 600
+SIM_RATE = 60
+
+# Words are placed with estimate_text_width (16 pixels a letter), so with
+# at least this many columns every word fits on its row
+MIN_COLS = 50
+MIN_ROWS = 12
+
+COUNTDOWN = 3
+
+
+# A rows x cols grid of characters and curses attributes
+class CellGrid:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.chars = [[" "] * cols for _ in range(rows)]
+        self.attrs = [[0] * cols for _ in range(rows)]
+
+    def clear(self):
+        for row in range(self.rows):
+            self.chars[row][:] = [" "] * self.cols
+            self.attrs[row][:] = [0] * self.cols
+
+    # Write `text` from (row, col), clipped to the grid
+    def put(self, row, col, text, attr=0):
+        if not 0 <= row < self.rows or col >= self.cols:
+            return
+        if col < 0:
+            text = text[-col:]
+            col = 0
+        text = text[:self.cols - col]
+        end = col + len(text)
+        self.chars[row][col:end] = text
+        self.attrs[row][col:end] = [attr] * len(text)
+
+    def put_center(self, row, text, attr=0):
+        self.put(row, (self.cols - len(text)) // 2, text, attr)
+
+
+# Sends a CellGrid to the terminal, writing only the cells that differ
+# from the previous frame; consecutive changed cells with the same
+# attribute go out as one string
+class CellRenderer:
+    def __init__(self, window):
+        self.window = window
+        self.frames = 0
+        self.cells = 0
+        self.resize()
+
+    def resize(self):
+        rows, cols = self.window.getmaxyx()
+        self.back = CellGrid(rows, cols)
+        # Nothing is known to be on screen, so the first frame sends it all
+        self.front = None
+        self.window.erase()
+
+    def present(self):
+        back, front = self.back, self.front
+        write = self.window.addstr
+        for row in range(back.rows):
+            chars, attrs = back.chars[row], back.attrs[row]
+            if front is not None:
+                old_chars, old_attrs = front.chars[row], front.attrs[row]
+                if chars == old_chars and attrs == old_attrs:
+                    continue
+            col = 0
+            while col < back.cols:
+                if front is not None and chars[col] == old_chars[col] and attrs[col] == old_attrs[col]:
+                    col += 1
+                    continue
+                start, attr = col, attrs[col]
+                col += 1
+                while (col < back.cols and attrs[col] == attr
+                       and (front is None or chars[col] != old_chars[col] or attrs[col] != old_attrs[col])):
+                    col += 1
+                try:
+                    write(row, start, "".join(chars[start:col]), attr)
+                except curses.error:
+                    # Writing the bottom-right cell moves the cursor off
+                    # screen; the text is still drawn
+                    pass
+                self.cells += col - start
+        self.window.noutrefresh()
+        curses.doupdate()
+        # The grid just sent becomes the reference; reuse the old one
+        if front is None:
+            front = CellGrid(back.rows, back.cols)
+        self.front, self.back = back, front
+        self.frames += 1
+
+
+class TerminalGame:
+    def __init__(self, window, fps=30, seed=None, dictionary=None, sessions_path=SESSIONS_DB):
+        self.window = window
+        self.fps = fps
+        self.renderer = CellRenderer(window)
+        self.state = GameState(WIDTH, HEIGHT, measure_text=estimate_text_width, seed=seed, dictionary=dictionary)
+        self.timestep = FixedTimestep(SIM_RATE)
+        self.sessions = SessionTracker(sessions_path)
+        # "start", "countdown", "playing", "paused" or "game_over"
+        self.screen = "start"
+        self.countdown_started = 0.0
+        self.running = True
+        self.colors = self._init_colors()
+
+    def _init_colors(self):
+        attrs = {"hud": curses.A_BOLD, "prefix": curses.A_BOLD | curses.A_UNDERLINE,
+                 "title": curses.A_BOLD}
+        colors = {MINT: 0, SKY_BLUE: 0, CORAL: 0}
+        if curses.has_colors():
+            curses.start_color()
+            try:
+                curses.use_default_colors()
+                background = -1
+            except curses.error:
+                background = curses.COLOR_BLACK
+            for pair, fg in enumerate((curses.COLOR_GREEN, curses.COLOR_CYAN, curses.COLOR_RED,
+                                       curses.COLOR_YELLOW, curses.COLOR_MAGENTA), start=1):
+                curses.init_pair(pair, fg, background)
+            colors = {MINT: curses.color_pair(1), SKY_BLUE: curses.color_pair(2), CORAL: curses.color_pair(3)}
+            attrs["prefix"] |= curses.color_pair(4)
+            attrs["title"] |= curses.color_pair(5)
+            attrs["hud"] |= curses.color_pair(2)
+        attrs["words"] = colors
+        return attrs
+
+    def start_game(self):
+        self.state.reset()
+        self.timestep.reset()
+        self.sessions.start()
+        self.screen = "playing"
+
+    # Keys read this frame -> game inputs, or screen changes
+    def handle_key(self, key, inputs):
+        if key == curses.KEY_RESIZE:
+            curses.update_lines_cols()
+            self.renderer.resize()
+            return
+        if key in ("\n", "\r", curses.KEY_ENTER):
+            key = SUBMIT
+        elif key in ("\x7f", "\b", curses.KEY_BACKSPACE):
+            key = BACKSPACE
+        elif key == "\x1b":
+            key = "escape"
+
+        if self.screen == "start":
+            if key == SUBMIT:
+                self.screen = "countdown"
+                self.countdown_started = time.monotonic()
+            elif key == "escape":
+                self.running = False
+        elif self.screen == "game_over":
+            if key == SUBMIT:
+                self.screen = "countdown"
+                self.countdown_started = time.monotonic()
+            elif key == "escape":
+                self.screen = "start"
+        elif self.screen == "paused":
+            if key == "escape":
+                self.screen = "playing"
+                self.timestep.reset()
+            elif key in ("m", "M"):
+                self.sessions.finish(self.state)
+                self.screen = "start"
+        elif self.screen == "playing":
+            if key == "escape":
+                self.screen = "paused"
+            elif key in (SUBMIT, BACKSPACE) or (isinstance(key, str) and key.isprintable()):
+                inputs.append(key)
+
+    def update(self, frame_time, inputs):
+        if self.screen == "countdown":
+            if time.monotonic() - self.countdown_started >= COUNTDOWN:
+                self.start_game()
+            return
+        if self.screen != "playing":
+            return
+        state = self.state
+        for _ in range(self.timestep.advance(frame_time)):
+            for kind, data in state.step(self.timestep.step, inputs):
+                if kind == HIT:
+                    self.sessions.word_typed(state, state.elapsed)
+                elif kind == GAME_OVER:
+                    self.sessions.finish(state)
+                    self.screen = "game_over"
+            # Keys typed this frame go to its first step only
+            inputs = []
+            if self.screen != "playing":
+                break
+
+    def draw(self):
+        grid = self.renderer.back
+        grid.clear()
+        if grid.rows < MIN_ROWS or grid.cols < MIN_COLS:
+            grid.put(0, 0, f"Terminal too small: need {MIN_COLS}x{MIN_ROWS}")
+        elif self.screen == "start":
+            self.draw_start(grid)
+        elif self.screen == "countdown":
+            remaining = COUNTDOWN - int(time.monotonic() - self.countdown_started)
+            grid.put_center(grid.rows // 2, str(max(1, remaining)), self.colors["title"])
+        elif self.screen == "game_over":
+            self.draw_game_over(grid)
+        else:
+            self.draw_game(grid, self.timestep.alpha)
+            if self.screen == "paused":
+                grid.put_center(grid.rows // 2 - 1, "  PAUSED  ", self.colors["title"] | curses.A_REVERSE)
+                grid.put_center(grid.rows // 2 + 1, "ESC to resume, M for the menu")
+        self.renderer.present()
+
+    def draw_start(self, grid):
+        middle = grid.rows // 2
+        grid.put_center(middle - 4, "W O R D   S H U T T E R", self.colors["title"])
+        grid.put_center(middle - 2, "Type the falling words before they reach the bottom")
+        sessions = self.sessions
+        best = f"{sessions.least_time:.1f}s" if sessions.least_time != float('inf') else "-"
+        grid.put_center(middle, f"High score {sessions.high_score}   Most words {sessions.highest_words}   "
+                                f"Best time {best}", self.colors["hud"])
+        grid.put_center(middle + 2, "ENTER to start, ESC to quit")
+
+    def draw_game_over(self, grid):
+        state = self.state
+        middle = grid.rows // 2
+        grid.put_center(middle - 3, "GAME OVER", self.colors["title"])
+        grid.put_center(middle - 1, f"Score {state.score}   Words {state.words_typed}   "
+                                    f"Max combo {state.max_combo}   Level {state.level}")
+        grid.put_center(middle, f"Time {state.elapsed:.1f}s   High score {self.sessions.high_score}", self.colors["hud"])
+        grid.put_center(middle + 2, "ENTER to play again, ESC for the menu")
+
+    # Rows 0 and rows-1 are the HUD and the input line; the playfield is
+    # scaled onto the rows in between
+    def draw_game(self, grid, alpha):
+        state = self.state
+        field_rows = grid.rows - 2
+        col_scale = grid.cols / WIDTH
+        row_scale = field_rows / HEIGHT
+
+        particles = state.particles
+        xs, ys, color_indexes, lives = particles.live(alpha)
+        word_colors = self.colors["words"]
+        palette = [word_colors.get(color, 0) for color in particles.palette]
+        for x, y, color_index, life in zip(xs, ys, color_indexes, lives):
+            grid.put(1 + int(y * row_scale), int(x * col_scale), "*" if life > 20 else ".", palette[color_index])
+
+        typed = state.input
+        prefix_attr = self.colors["prefix"]
+        words = state.words
+        for x, y, text, color in zip(*words.positions(alpha), words.text, words.color):
+            row = 1 + int(y * row_scale)
+            if row > field_rows:
+                continue
+            col = int(x * col_scale)
+            grid.put(row, col, text, word_colors.get(color, 0))
+            if typed and text.startswith(typed):
+                grid.put(row, col, typed, prefix_attr)
+
+        hud = self.colors["hud"]
+        grid.put(0, 0, " " * grid.cols, hud | curses.A_REVERSE)
+        grid.put(0, 1, f"Lvl {state.level}  Score {state.score}  Words {state.words_typed}", hud | curses.A_REVERSE)
+        right = f"{state.combo}x  {int(state.elapsed)}s "
+        grid.put(0, grid.cols - len(right), right, hud | curses.A_REVERSE)
+        grid.put(grid.rows - 1, 0, f"Type: {typed}_")
+
+    def run(self):
+        try:
+            self._loop()
+        finally:
+            # A game still running counts as played
+            self.sessions.finish(self.state)
+            self.sessions.close()
+
+    def _loop(self):
+        window = self.window
+        frame = 1.0 / self.fps
+        last = time.perf_counter()
+        next_frame = last
+        while self.running:
+            inputs = []
+            # Wait for the next frame, waking up as soon as a key arrives
+            timeout = max(0, int((next_frame - time.perf_counter()) * 1000))
+            window.timeout(timeout)
+            try:
+                key = window.get_wch()
+            except curses.error:
+                key = None
+            while key is not None:
+                self.handle_key(key, inputs)
+                window.timeout(0)
+                try:
+                    key = window.get_wch()
+                except curses.error:
+                    key = None
+            now = time.perf_counter()
+            self.update(now - last, inputs)
+            last = now
+            self.draw()
+            next_frame = max(next_frame + frame, time.perf_counter())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play Word Shutter in the terminal.")
+    parser.add_argument("--fps", type=int, default=30, help="frames drawn per second (the game always steps at 60)")
+    parser.add_argument("--seed", type=int, help="seed for reproducible games")
+    parser.add_argument("--words", default=os.environ.get("WORD_SHUTTER_WORDS"),
+                        help="word list, one word per line (default: WORD_SHUTTER_WORDS or the built-in words)")
+    parser.add_argument("--db", default=os.environ.get("WORD_SHUTTER_DB", SESSIONS_DB), help="session database")
+    parser.add_argument("--stats", action="store_true", help="print how many cells were sent per frame on exit")
+    args = parser.parse_args(argv)
+
+    dictionary = None
+    if args.words:
+        dictionary = load_dictionary(args.words, estimate_text_width, "estimate-16", max_width=WIDTH - 100)
+
+    # ESC pauses; do not wait the default second for an escape sequence
+    os.environ.setdefault("ESCDELAY", "25")
+
+    def play(window):
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        game = TerminalGame(window, fps=args.fps, seed=args.seed, dictionary=dictionary, sessions_path=args.db)
+        try:
+            game.run()
+        except KeyboardInterrupt:
+            pass
+        return game.renderer
+
+    renderer = curses.wrapper(play)
+    if args.stats and renderer.frames:
+        print(f"{renderer.frames} frames, {renderer.cells / renderer.frames:.1f} cells sent per frame")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
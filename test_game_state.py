@@ -0,0 +1,113 @@
+from colors import MINT
+from game_state import BACKSPACE, GameState, HIT, MISS, SUBMIT
+from replay import Recording, SessionRecorder, run_headless
+from word_index import PrefixCursor, WordIndex
+from word_store import WordStore
+
+DT = 1.0 / 60
+
+
+def test_fallen_follows_swap_removes():
+    words = WordStore(bottom=100, capacity=2)
+    # Reach the bottom after 10, 2, 5 and 4 seconds
+    a = words.add("a", 0, 0, 10, None, 10)
+    b = words.add("b", 0, 0, 50, None, 10)
+    c = words.add("c", 0, 0, 20, None, 10)
+    d = words.add("d", 0, 0, 25, None, 10)
+    # d moves into b's slot
+    words.remove(b)
+    assert words.lowest() == d
+    words.advance(4.5)
+    assert words.fallen() == d
+    words.remove(d)
+    assert words.lowest() == c
+    assert words.fallen() is None
+    words.advance(1.0)
+    assert words.fallen() == c
+    assert words.position(a) == (0.0, 55.0)
+
+
+def test_swap_removes_keep_words_with_their_ids():
+    words = WordStore(bottom=1000)
+    ids = [words.add(f"w{i}", i, 0, 1 + i, None, 10) for i in range(200)]
+    # Enough removals to prune the stale exit heap entries
+    for word_id in ids[::2]:
+        words.remove(word_id)
+    assert len(words) == 100
+    for i in ids[1::2]:
+        word = words.get(i)
+        assert (word.text, word.x, word.speed) == (f"w{i}", i, 1 + i)
+    assert words.lowest() == ids[-1]
+    assert words.find("w0") == ()
+    assert words.find("w1") == {ids[1]}
+
+
+def test_submit_clears_every_matching_word():
+    state = GameState(seed=1)
+    first = state.words.add("cat", 100, 50, 10, MINT, 48)
+    state.words.add("dog", 300, 50, 10, MINT, 48)
+    second = state.words.add("cat", 500, 80, 10, MINT, 48)
+    events = state.step(DT, "cat" + SUBMIT)
+    assert [data.id for kind, data in events if kind == HIT] == [first, second]
+    assert (state.words_typed, state.combo, state.score) == (2, 2, 32)
+    assert state.words.find("cat") == ()
+    assert len(state.words.find("dog")) == 1
+
+    events = state.step(DT, "cow" + SUBMIT)
+    assert (MISS, "cow") in events
+    assert state.combo == 0
+
+
+def test_cursor_targets_follow_the_index():
+    index = WordIndex()
+    cursor = PrefixCursor(index)
+    cursor.push("ca")
+    assert not cursor.targets()
+    index.add("cat", 1)
+    assert set(cursor.targets()) == {1}
+    index.add("car", 2)
+    index.add("dog", 3)
+    assert set(cursor.targets()) == {1, 2}
+    index.remove("cat", 1)
+    assert set(cursor.targets()) == {2}
+    # Past the end of the trie and back
+    cursor.push("x")
+    assert not cursor.targets()
+    cursor.pop()
+    cursor.pop()
+    assert set(cursor.targets()) == {2}
+    index.clear()
+    assert not cursor.targets()
+    index.add("cow", 4)
+    assert set(cursor.targets()) == {4}
+
+
+def test_recording_replays_headless(tmp_path):
+    path = str(tmp_path / "session.wsr")
+    state = GameState(800, 600, seed=7)
+    recorder = SessionRecorder(path, state.seed, 60, 800, 600)
+    while not state.game_over and state.ticks < 3600:
+        if state.ticks == 600:
+            recorder.pause(state.ticks)
+            recorder.resume(state.ticks, 1.5)
+        inputs = ""
+        if state.ticks % 45 == 0 and len(state.words):
+            # Type the word closest to the bottom, with a slip now and then
+            inputs = state.words.get(state.words.lowest()).text
+            if state.ticks % 4 == 0:
+                inputs = "x" + BACKSPACE + inputs
+            inputs += SUBMIT
+        elif state.ticks % 301 == 0:
+            inputs = "zzz" + SUBMIT
+        tick = state.ticks
+        recorder.step(tick, inputs, state.step(DT, inputs))
+    recorder.close(state)
+    assert state.words_typed > 0
+
+    recording = Recording(path)
+    assert recording.end == (state.ticks, state.score, state.words_typed)
+    assert recording.pauses == {600: 1.5}
+    replayed, source, _ = run_headless(recording)
+    assert source.diverged == 0
+    assert (replayed.ticks, replayed.score, replayed.words_typed, replayed.max_combo) == \
+        (state.ticks, state.score, state.words_typed, state.max_combo)
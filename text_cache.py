@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+import pygame
+
+# Keyed cache of rendered text surfaces
+#
+# Rendering text with pygame.font is slow compared to blitting an existing
+# surface, so every (text, font, colour, shadow) combination is rendered
+# once and reused. The least recently used entries are evicted when the
+# cache is full, which keeps strings that change every frame (input box,
+# timer) from growing it without bound.
+class TextCache:
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    # Plain antialiased text, as returned by font.render
+    def render(self, text, font, color):
+        return self._get((text, font, color, None), font)
+
+    # Text composited over its drop shadow, offset by `offset` pixels.
+    # The returned surface is `offset` pixels larger than the text in
+    # both directions and should be blitted at the text position.
+    def render_shadow(self, text, font, color, shadow_color, offset=2):
+        return self._get((text, font, color, (shadow_color, offset)), font)
+
+    def _get(self, key, font):
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        text, _, color, shadow = key
+        if shadow is None:
+            surface = font.render(text, True, color)
+        else:
+            shadow_color, offset = shadow
+            main_text = font.render(text, True, color)
+            shadow_text = font.render(text, True, shadow_color)
+            surface = pygame.Surface(
+                (main_text.get_width() + offset, main_text.get_height() + offset),
+                pygame.SRCALPHA,
+            )
+            surface.blit(shadow_text, (offset, offset))
+            surface.blit(main_text, (0, 0))
+
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._surfaces),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,107 @@
+# Lookup structures over the words currently on screen
+#
+# WordIndex maps each text to the ids of the live words showing it, so a
+# submitted word is found with one dict lookup, and keeps a prefix trie
+# whose nodes hold the ids of every live word starting with that prefix.
+# PrefixCursor walks the trie one typed character at a time, so finding
+# the words targeted by the current input costs O(1) per keystroke.
+
+class TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+
+class WordIndex:
+    def __init__(self):
+        self.by_text = {}
+        self.root = TrieNode()
+        # Bumped whenever a trie node is created, so cursors that ran off
+        # the trie know when it is worth walking it again
+        self.version = 0
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.by_text.values())
+
+    def add(self, text, word_id):
+        self.by_text.setdefault(text, set()).add(word_id)
+        node = self.root
+        node.ids.add(word_id)
+        for ch in text:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = TrieNode()
+                self.version += 1
+            child.ids.add(word_id)
+            node = child
+
+    # Trie nodes are kept when they empty out: the set of prefixes is
+    # bounded by the word list, and cursors may still be standing on them
+    def remove(self, text, word_id):
+        ids = self.by_text.get(text)
+        if ids is None or word_id not in ids:
+            return
+        ids.discard(word_id)
+        if not ids:
+            del self.by_text[text]
+        node = self.root
+        node.ids.discard(word_id)
+        for ch in text:
+            node = node.children[ch]
+            node.ids.discard(word_id)
+
+    def find(self, text):
+        return self.by_text.get(text, ())
+
+    def clear(self):
+        self.by_text.clear()
+        self.root = TrieNode()
+        self.version += 1
+
+
+# Position in the trie matching the text typed so far
+class PrefixCursor:
+    def __init__(self, index):
+        self.index = index
+        self.text = ""
+        self._root = index.root
+        self._path = [index.root]
+        self._version = index.version
+
+    # Characters typed past the end of the trie are only counted in `text`
+    def push(self, chars):
+        for ch in chars:
+            self.text += ch
+            if len(self._path) == len(self.text):
+                child = self._path[-1].children.get(ch)
+                if child is not None:
+                    self._path.append(child)
+
+    def pop(self):
+        if not self.text:
+            return
+        if len(self._path) > len(self.text):
+            self._path.pop()
+        self.text = self.text[:-1]
+
+    def reset(self):
+        self.text = ""
+        self._path = [self.index.root]
+        self._root = self.index.root
+        self._version = self.index.version
+
+    # Ids of the live words that start with the typed text
+    def targets(self):
+        if self._root is not self.index.root or (
+                len(self._path) <= len(self.text) and self._version != self.index.version):
+            self._rewalk()
+        if len(self._path) <= len(self.text):
+            return ()
+        return self._path[-1].ids
+
+    def _rewalk(self):
+        text = self.text
+        self.reset()
+        self.push(text)
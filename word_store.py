@@ -0,0 +1,176 @@
+import heapq
+
+import numpy as np
+
+from word_index import WordIndex
+
+# Read-only snapshot of one word, for code that is not on the hot path
+class Word:
+    __slots__ = ("id", "text", "x", "y", "speed", "color", "width")
+
+    def __init__(self, id, text, x, y, speed, color, width):
+        self.id = id
+        self.text = text
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.color = color
+        self.width = width
+
+    def __repr__(self):
+        return f"Word({self.id}, {self.text!r}, y={self.y:.1f})"
+
+
+# `surfaces` with every missing one made by make_sprite(text, color)
+def fill_sprites(surfaces, texts, colors, make_sprite):
+    if make_sprite is None or None not in surfaces:
+        return surfaces
+    return [make_sprite(text, color) if surface is None else surface
+            for surface, text, color in zip(surfaces, texts, colors)]
+
+
+# Structure-of-arrays store for the falling words
+#
+# Positions and speeds live in NumPy arrays so every word moves with one
+# vectorized add; text, colour, width and the rendered surface live in
+# parallel lists. Words are packed at the front and removed by moving the
+# last word into the freed slot, so ids (not slots) are the stable handle.
+#
+# Words fall at a constant speed, so the moment each one passes `bottom`
+# is known when it spawns. Those moments are kept in a heap, which lets
+# fallen() look at the single word that will reach the bottom first
+# instead of scanning every word.
+#
+# `index` is kept in sync with every add and remove, for submit lookups
+# and prefix targeting while typing.
+class WordStore:
+    def __init__(self, bottom, capacity=64):
+        self.bottom = bottom
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.prev_y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.ids = []
+        self.text = []
+        self.color = []
+        self.width = []
+        self.surface = []
+        self.time = 0.0
+        self._slots = {}
+        self._exits = []
+        self._next_id = 0
+        self.index = WordIndex()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, word_id):
+        return word_id in self._slots
+
+    def __iter__(self):
+        return (self.get(word_id) for word_id in list(self.ids))
+
+    def add(self, text, x, y, speed, color, width, surface=None):
+        slot = len(self.ids)
+        if slot == len(self.x):
+            self._grow()
+        word_id = self._next_id
+        self._next_id += 1
+        self.x[slot] = x
+        self.y[slot] = y
+        self.prev_y[slot] = y
+        self.speed[slot] = speed
+        self.ids.append(word_id)
+        self.text.append(text)
+        self.color.append(color)
+        self.width.append(width)
+        self.surface.append(surface)
+        self._slots[word_id] = slot
+        self.index.add(text, word_id)
+        exit_time = self.time + (self.bottom - y) / speed if speed > 0 else float('inf')
+        heapq.heappush(self._exits, (exit_time, word_id))
+        return word_id
+
+    def _grow(self):
+        old = len(self.x)
+        for name in ("x", "y", "prev_y", "speed"):
+            array = np.zeros(old * 2)
+            array[:old] = getattr(self, name)
+            setattr(self, name, array)
+
+    # Swap-remove: the last word takes over the freed slot
+    def remove(self, word_id):
+        slot = self._slots.pop(word_id)
+        self.index.remove(self.text[slot], word_id)
+        last = len(self.ids) - 1
+        if slot != last:
+            moved_id = self.ids[last]
+            self.x[slot] = self.x[last]
+            self.y[slot] = self.y[last]
+            self.prev_y[slot] = self.prev_y[last]
+            self.speed[slot] = self.speed[last]
+            for column in (self.ids, self.text, self.color, self.width, self.surface):
+                column[slot] = column[last]
+            self._slots[moved_id] = slot
+        for column in (self.ids, self.text, self.color, self.width, self.surface):
+            column.pop()
+        # Drop stale heap entries once they outnumber the live words
+        if len(self._exits) > 2 * len(self.ids) + 64:
+            self._exits = [e for e in self._exits if e[1] in self._slots]
+            heapq.heapify(self._exits)
+
+    def get(self, word_id):
+        slot = self._slots[word_id]
+        return Word(word_id, self.text[slot], float(self.x[slot]), float(self.y[slot]),
+                    float(self.speed[slot]), self.color[slot], self.width[slot])
+
+    # Move every word by speed * dt
+    def advance(self, dt):
+        n = len(self.ids)
+        self.prev_y[:n] = self.y[:n]
+        self.y[:n] += self.speed[:n] * dt
+        self.time += dt
+
+    # Id of the word that will reach the bottom first, or None
+    def lowest(self):
+        exits = self._exits
+        while exits and exits[0][1] not in self._slots:
+            heapq.heappop(exits)
+        return exits[0][1] if exits else None
+
+    # Id of a word that has fallen past the bottom, or None
+    def fallen(self):
+        word_id = self.lowest()
+        if word_id is not None and self.y[self._slots[word_id]] > self.bottom:
+            return word_id
+        return None
+
+    # Ids of the live words showing exactly `text`
+    def find(self, text):
+        return self.index.find(text)
+
+    def position(self, word_id, alpha=1.0):
+        slot = self._slots[word_id]
+        y = self.prev_y[slot] + (self.y[slot] - self.prev_y[slot]) * alpha
+        return float(self.x[slot]), float(y)
+
+    # x and y lists of every word, in slot order, with y interpolated
+    # `alpha` of the way from the previous advance() to the latest one
+    def positions(self, alpha=1.0):
+        n = len(self.ids)
+        y = self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha
+        return self.x[:n].tolist(), y.tolist()
+
+    # (surface, (x, y)) pairs for Surface.blits, interpolated as above.
+    # Words added without a surface get one from make_sprite(text, color).
+    def sprites(self, alpha=1.0, make_sprite=None):
+        return list(zip(fill_sprites(self.surface, self.text, self.color, make_sprite),
+                        zip(*self.positions(alpha))))
+
+    def clear(self):
+        for column in (self.ids, self.text, self.color, self.width, self.surface):
+            column.clear()
+        self._slots.clear()
+        self._exits.clear()
+        self.index.clear()
+        self.time = 0.0